@@ -23,4 +23,6 @@
 """
 __VERSION__='3.0'
 from .mftool import Mftool
+from .async_mftool import AsyncMftool
+from .nav_history import NavHistory
 
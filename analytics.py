@@ -0,0 +1,458 @@
+"""
+    vectorised analytics over scheme NAV histories. every function takes an aligned NAV panel,
+    a Dataframe indexed by date with one float column per scheme, and computes all schemes at once
+"""
+import numpy as np
+import pandas as pd
+from .nav_history import NavHistory
+
+
+TRADING_DAYS = 252
+
+
+def nav_series(history):
+    """
+    converts the output of get_scheme_historical_nav to a float NAV series indexed by date, oldest first
+    :param history: dict returned by get_scheme_historical_nav(), its as_Dataframe=True Dataframe or NavHistory
+    :return: Series
+    """
+    if isinstance(history, NavHistory):
+        return history.to_series()
+    if isinstance(history, pd.DataFrame):
+        df = history
+        dates = df.index
+    else:
+        df = pd.DataFrame.from_records(history['data'], columns=['date', 'nav'])
+        dates = df['date']
+    series = pd.Series(df['nav'].astype('float64').values,
+                       index=pd.DatetimeIndex(pd.to_datetime(dates, format='%d-%m-%Y'), name='date'))
+    series = series[~series.index.duplicated(keep='first')]
+    return series.sort_index()
+
+
+def nav_panel(histories, fill_limit=None):
+    """
+    aligns many NAV histories on one date index, built in a single concat
+    :param histories: dict of scheme code and get_scheme_historical_nav output, or of NAV Series
+    :param fill_limit: forward fill holidays for at most this many rows, 0 to disable, default unlimited
+    :return: Dataframe indexed by date with one float64 column per scheme code
+    """
+    columns = {code: (history if isinstance(history, pd.Series) else nav_series(history))
+               for code, history in histories.items()}
+    if not columns:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='date'), dtype='float64')
+    panel = pd.concat(columns, axis=1, sort=True)
+    panel.index.name = 'date'
+    if fill_limit != 0:
+        # only fill between a scheme's first and last NAV, not before launch or after closure
+        panel = panel.ffill(limit=fill_limit).where(panel.bfill().notna())
+    return panel
+
+
+def daily_returns(panel):
+    """
+    :param panel: NAV panel
+    :return: Dataframe of simple daily returns
+    """
+    return panel.pct_change(fill_method=None)
+
+
+def _years_back(panel, years):
+    # NAV on or before the same date `years` earlier, for every row and scheme at once
+    past = panel.ffill().reindex(panel.index - pd.DateOffset(years=years), method='ffill')
+    past.index = panel.index
+    return past
+
+
+def rolling_returns(panel, years=1, annualise=True):
+    """
+    point to point returns over every window of `years` ending on each date
+    :param panel: NAV panel
+    :param years: window length in years
+    :param annualise: annualise windows longer than a year, default True
+    :return: Dataframe of returns, NaN where the scheme is younger than the window
+    """
+    ratio = panel / _years_back(panel, years)
+    if annualise and years > 1:
+        return ratio ** (1.0 / years) - 1
+    return ratio - 1
+
+
+def trailing_returns(panel, periods=(1, 3, 5), annualise=True):
+    """
+    returns over the last 1 / 3 / 5 years up to the latest date of the panel
+    :param panel: NAV panel
+    :param periods: years of the trailing windows
+    :param annualise: annualise windows longer than a year, default True
+    :return: Dataframe with one row per scheme and one column per period eg- '1Y', '3Y'
+    """
+    filled = panel.ffill()
+    end = filled.index[-1:]
+    result = {}
+    for years in periods:
+        ratio = filled.iloc[-1] / filled.reindex(end - pd.DateOffset(years=years), method='ffill').iloc[0]
+        result['%dY' % years] = ratio ** (1.0 / years) - 1 if annualise and years > 1 else ratio - 1
+    return pd.DataFrame(result, index=panel.columns)
+
+
+def _first_valid(panel):
+    values = panel.values
+    valid = ~np.isnan(values)
+    first = valid.argmax(axis=0)
+    last = len(values) - 1 - valid[::-1].argmax(axis=0)
+    columns = np.arange(values.shape[1])
+    has_data = valid.any(axis=0)
+    return first, last, columns, has_data
+
+
+def cagr(panel):
+    """
+    compound annual growth rate from each scheme's first to last NAV in the panel
+    :param panel: NAV panel
+    :return: Series indexed by scheme code
+    """
+    first, last, columns, has_data = _first_valid(panel)
+    values = panel.values
+    days = (panel.index.values[last] - panel.index.values[first]) / np.timedelta64(1, 'D')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = values[last, columns] / values[first, columns]
+        result = np.where(has_data & (days > 0), growth ** (365.25 / days) - 1, np.nan)
+    return pd.Series(result, index=panel.columns, name='cagr')
+
+
+def volatility(panel, periods=TRADING_DAYS):
+    """
+    annualised standard deviation of daily returns
+    :param panel: NAV panel
+    :param periods: return periods per year
+    :return: Series indexed by scheme code
+    """
+    return (daily_returns(panel).std() * np.sqrt(periods)).rename('volatility')
+
+
+def max_drawdown(panel):
+    """
+    largest fall from a previous peak, as a negative fraction
+    :param panel: NAV panel
+    :return: Series indexed by scheme code
+    """
+    return (panel / panel.cummax() - 1).min().rename('max_drawdown')
+
+
+def drawdown(panel):
+    """
+    fall from the running peak on every date
+    :param panel: NAV panel
+    :return: Dataframe
+    """
+    return panel / panel.cummax() - 1
+
+
+def high_low(panel, weeks=52):
+    """
+    highest and lowest NAV of every scheme over the last `weeks` of the panel, eg- the 52 week high / low
+    :param panel: NAV panel
+    :param weeks: window length in weeks
+    :return: Dataframe with one row per scheme and high, low columns
+    """
+    window = panel.loc[panel.index[-1] - pd.Timedelta(weeks=weeks):]
+    return pd.DataFrame({'high': window.max(), 'low': window.min()}, index=panel.columns)
+
+
+def sharpe_ratio(panel, risk_free=0.0, periods=TRADING_DAYS):
+    """
+    annualised Sharpe ratio of daily returns
+    :param panel: NAV panel
+    :param risk_free: annual risk free rate eg- 0.065
+    :param periods: return periods per year
+    :return: Series indexed by scheme code
+    """
+    excess = daily_returns(panel) - ((1 + risk_free) ** (1.0 / periods) - 1)
+    return (excess.mean() / excess.std() * np.sqrt(periods)).rename('sharpe')
+
+
+def sortino_ratio(panel, risk_free=0.0, periods=TRADING_DAYS):
+    """
+    annualised Sortino ratio, only returns below the risk free rate count as risk
+    :param panel: NAV panel
+    :param risk_free: annual risk free rate eg- 0.065
+    :param periods: return periods per year
+    :return: Series indexed by scheme code
+    """
+    excess = daily_returns(panel) - ((1 + risk_free) ** (1.0 / periods) - 1)
+    downside = np.sqrt((excess.clip(upper=0) ** 2).mean())
+    return (excess.mean() / downside * np.sqrt(periods)).rename('sortino')
+
+
+def calendar_year_returns(panel):
+    """
+    return of every calendar year, the first year is measured from the scheme's first NAV
+    :param panel: NAV panel
+    :return: Dataframe indexed by year with one column per scheme
+    """
+    years = panel.groupby(panel.index.year)
+    year_end = years.last()
+    start = year_end.shift(1).fillna(years.first())
+    result = year_end / start - 1
+    result.index.name = 'year'
+    return result
+
+
+def _to_datetime(dates):
+    # 'dd-mm-YYYY' text as used by mfapi.in, or anything pandas understands
+    dates = list(dates)
+    if all(isinstance(day, str) for day in dates):
+        return pd.to_datetime(dates, format='%d-%m-%Y')
+    return pd.to_datetime([pd.to_datetime(day, format='%d-%m-%Y') if isinstance(day, str) else day
+                           for day in dates])
+
+
+def _npv(amounts, years, rate):
+    discount = (1 + rate[:, None]) ** -years
+    npv = (amounts * discount).sum(axis=1)
+    derivative = (-years * amounts * discount).sum(axis=1) / (1 + rate)
+    return npv, derivative
+
+
+def xirr_batch(cashflows, guess=0.1, tol=1e-9, max_iter=50):
+    """
+    solves the XIRR of many cash flow schedules at once, Newton's method on all schedules together
+    with bisection for the ones it does not solve
+    :param cashflows: list of schedules, each a list of (date, amount) with investments negative and
+            redemptions / current value positive. dates are datetime.date or 'dd-mm-YYYY'
+    :param guess: starting annual rate
+    :param tol: tolerance of the rate
+    :param max_iter: Newton iterations
+    :return: numpy array of annual rates, NaN for a schedule without both an investment and a return
+    """
+    count = len(cashflows)
+    width = max([len(flows) for flows in cashflows] or [0])
+    amounts = np.zeros((count, width))
+    years = np.zeros((count, width))
+    for i, flows in enumerate(cashflows):
+        if not flows:
+            continue
+        dates, values = zip(*flows)
+        days = _to_datetime(dates).values.astype('datetime64[D]').astype('float64')
+        amounts[i, :len(flows)] = values
+        years[i, :len(flows)] = (days - days.min()) / 365.0
+    return _solve_xirr(amounts, years, guess, tol, max_iter)
+
+
+def _solve_xirr(amounts, years, guess=0.1, tol=1e-9, max_iter=50):
+    # one schedule per row of amounts, years are the row's times from its first cash flow
+    count = len(amounts)
+    scale = np.abs(amounts).sum(axis=1)
+    solvable = (amounts < 0).any(axis=1) & (amounts > 0).any(axis=1) & np.isfinite(amounts).all(axis=1)
+
+    rate = np.full(count, float(guess))
+    with np.errstate(all='ignore'):
+        for _ in range(max_iter):
+            npv, derivative = _npv(amounts, years, rate)
+            step = npv / derivative
+            rate = rate - step
+            if not np.any(np.abs(step[np.isfinite(step)]) > tol):
+                break
+        npv, _ = _npv(amounts, years, rate)
+        solved = np.isfinite(rate) & (rate > -1) & (np.abs(npv) <= 1e-6 * scale)
+
+        # bracketing fallback, between -99.99% and 10000% a year
+        retry = np.flatnonzero(solvable & ~solved)
+        if len(retry):
+            lo = np.full(len(retry), -0.9999)
+            hi = np.full(len(retry), 100.0)
+            f_lo, _ = _npv(amounts[retry], years[retry], lo)
+            f_hi, _ = _npv(amounts[retry], years[retry], hi)
+            bracketed = np.sign(f_lo) != np.sign(f_hi)
+            for _ in range(200):
+                mid = (lo + hi) / 2
+                f_mid, _ = _npv(amounts[retry], years[retry], mid)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(left, mid, lo)
+                f_lo = np.where(left, f_mid, f_lo)
+                hi = np.where(left, hi, mid)
+                if np.all(hi - lo < tol):
+                    break
+            rate[retry] = np.where(bracketed, (lo + hi) / 2, np.nan)
+            solved[retry] = bracketed
+    return np.where(solvable & solved, rate, np.nan)
+
+
+def xirr(cashflows, guess=0.1):
+    """
+    :param cashflows: list of (date, amount) with investments negative and redemptions / current value positive
+    :param guess: starting annual rate
+    :return: annual rate eg- 0.12 for 12%, NaN when it has no solution
+    """
+    return float(xirr_batch([cashflows], guess)[0])
+
+
+def price_transactions(nav, dates, amounts):
+    """
+    units allotted for transactions at the NAV of their date, or of the next NAV date for holidays
+    :param nav: NAV series indexed by date, oldest first eg- nav_series(history)
+    :param dates: transaction dates
+    :param amounts: amounts, purchases positive and redemptions negative
+    :return: numpy array of units
+    :raises: ValueError, a date is before the first NAV or after the last one
+    """
+    dates = _to_datetime(dates)
+    position = nav.index.searchsorted(dates)
+    outside = (dates < nav.index[0]) | (position >= len(nav))
+    if outside.any():
+        raise ValueError("no NAV for %s, NAVs are from %s to %s"
+                         % (', '.join(day.strftime('%d-%m-%Y') for day in dates[outside]),
+                            nav.index[0].strftime('%d-%m-%Y'), nav.index[-1].strftime('%d-%m-%Y')))
+    return np.asarray(amounts, dtype='float64') / nav.values[position]
+
+
+# step of every instalment frequency, in days or in months
+FREQUENCIES = {'weekly': (7, 'D'), 'monthly': (1, 'M'), 'quarterly': (3, 'M'), 'yearly': (12, 'M')}
+
+
+def schedule(starts, count, frequency='monthly'):
+    """
+    instalment dates of SIPs starting on each of starts. monthly instalments keep the day of the
+    start date, clamped to the end of shorter months
+    :param starts: start dates
+    :param count: instalments per SIP
+    :param frequency: 'weekly', 'monthly', 'quarterly' or 'yearly'
+    :return: numpy datetime64[D] array with one row per start date
+    :raises: ValueError
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError("frequency must be one of %s" % ', '.join(FREQUENCIES))
+    step, unit = FREQUENCIES[frequency]
+    starts = _to_datetime(starts).values.astype('datetime64[D]')[:, None]
+    offsets = np.arange(count) * step
+    if unit == 'D':
+        return starts + offsets
+    months = starts.astype('datetime64[M]') + offsets
+    first = months.astype('datetime64[D]')
+    length = (months + 1).astype('datetime64[D]') - first
+    day = starts - starts.astype('datetime64[M]').astype('datetime64[D]')
+    return first + np.minimum(day, length - np.timedelta64(1, 'D'))
+
+
+def simulate(nav, start, amount, frequency='monthly', end=None, lumpsum=False, weights=None):
+    """
+    backtests a SIP, or a lumpsum, in a scheme or a basket of schemes. every instalment buys units
+    at the NAV of its date, or of the next NAV date for holidays
+    :param nav: NAV series of a scheme, or NAV panel of a basket
+    :param start: date of the first instalment
+    :param amount: amount of every instalment, or the lumpsum
+    :param frequency: 'weekly', 'monthly', 'quarterly' or 'yearly'
+    :param end: valuation date, default the latest NAV date
+    :param lumpsum: invest amount once on start, default false
+    :param weights: dict of scheme code and share of every instalment for a basket, default equal shares
+    :return: Dataframe indexed by NAV date with amount, invested, value and drawdown columns, and units for
+            a single scheme. invested, value, absolute_return, xirr and max_drawdown are in Dataframe.attrs['summary']
+    :raises: ValueError
+    """
+    single = isinstance(nav, pd.Series)
+    panel = nav.to_frame() if single else nav
+    if end is not None:
+        panel = panel.loc[:_to_datetime([end])[0]]
+    values = panel.ffill().values
+    dates = panel.index.values.astype('datetime64[D]')
+    start = _to_datetime([start]).values.astype('datetime64[D]')
+    if len(dates) and start[0] < dates[0]:
+        raise ValueError("start date is before the first NAV %s" % np.datetime_as_string(dates[0]))
+    if lumpsum or len(dates) == 0:
+        instalments = start
+    else:
+        step, unit = FREQUENCIES.get(frequency, (1, 'D'))
+        count = int((dates[-1] - start[0]).astype(int) // (step * (28 if unit == 'M' else 1))) + 2
+        instalments = schedule(start, max(count, 1), frequency)[0]
+    buy = dates.searchsorted(instalments)
+    instalments = instalments[buy < len(dates)]
+    buy = buy[buy < len(dates)]
+    if not len(buy):
+        raise ValueError("no NAV on or after the start date")
+
+    if weights is None:
+        shares = np.full(values.shape[1], 1.0 / values.shape[1])
+    else:
+        shares = np.array([weights.get(code, 0.0) for code in panel.columns], dtype='float64')
+        shares = shares / shares.sum()
+    prices = values[buy]
+    if np.isnan(prices[:, shares > 0]).any():
+        raise ValueError("some schemes have no NAV on %s" % np.datetime_as_string(instalments[0]))
+    bought = np.zeros(values.shape)
+    np.add.at(bought, buy, np.where(shares > 0, amount * shares / np.where(shares > 0, prices, 1), 0.0))
+    flows = np.zeros(len(dates))
+    np.add.at(flows, buy, float(amount))
+
+    first = buy[0]
+    units = bought.cumsum(axis=0)[first:]
+    held = np.where(units > 0, values[first:], 0.0)
+    value = (units * held).sum(axis=1)
+    # time weighted growth, so instalments do not count as gains in the drawdown
+    carried = (units[:-1] * held[1:]).sum(axis=1)
+    growth = np.concatenate([[1.0], carried / value[:-1]]).cumprod()
+    drawdowns = growth / np.maximum.accumulate(growth) - 1
+
+    df = pd.DataFrame({'amount': flows[first:], 'invested': flows[first:].cumsum(), 'value': value,
+                       'drawdown': drawdowns}, index=pd.DatetimeIndex(panel.index[first:], name='date'))
+    if single:
+        df.insert(2, 'units', units[:, 0])
+    invested = float(df['invested'].iloc[-1])
+    years = np.append(instalments - instalments[0], dates[-1] - instalments[0]).astype('float64') / 365.0
+    cashflows = np.append(np.full(len(instalments), -float(amount)), value[-1])
+    df.attrs['summary'] = {'invested': invested, 'value': float(value[-1]),
+                           'absolute_return': float(value[-1] / invested - 1),
+                           'xirr': float(_solve_xirr(cashflows[None, :], years[None, :])[0]),
+                           'max_drawdown': float(drawdowns.min())}
+    return df
+
+
+def sweep(panel, starts, amount, instalments, frequency='monthly', lumpsum=False):
+    """
+    backtests the same SIP, or lumpsum, from many start dates in every scheme of the panel at once
+    :param panel: NAV panel, or NAV series of a scheme
+    :param starts: start dates eg- pd.date_range('2015-01-01', '2020-12-01', freq='MS')
+    :param amount: amount of every instalment, or the lumpsum
+    :param instalments: instalments of every SIP, the investment is valued one period after the last one
+    :param frequency: 'weekly', 'monthly', 'quarterly' or 'yearly'
+    :param lumpsum: invest amount once on the start date and hold it for the same period, default false
+    :return: Dataframe indexed by (start, scheme_code) with invested, value, absolute_return and xirr,
+            NaN where the scheme has no NAV over the whole period
+    """
+    if isinstance(panel, pd.Series):
+        panel = panel.to_frame()
+    values = panel.ffill().values
+    dates = panel.index.values.astype('datetime64[D]')
+    plan = schedule(starts, instalments + 1, frequency)
+    if lumpsum:
+        plan = plan[:, [0, -1]]
+    buy = dates.searchsorted(plan[:, :-1])
+    sell = dates.searchsorted(plan[:, -1], side='right') - 1
+    valid = (plan[:, 0] >= dates[0]) & (buy < len(dates)).all(axis=1) & (plan[:, -1] <= dates[-1])
+    buy = buy.clip(max=len(dates) - 1)
+
+    count, columns = len(plan), values.shape[1]
+    paid = buy.shape[1] * float(amount)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = (amount / values[buy]).sum(axis=1) * values[sell]
+    value[~valid] = np.nan
+    # one cash flow schedule per start and scheme, all solved together
+    flows = np.full((count, columns, plan.shape[1]), -float(amount))
+    flows[:, :, -1] = value
+    years = (plan - plan[:, :1]).astype('float64') / 365.0
+    rates = _solve_xirr(flows.reshape(count * columns, -1), np.repeat(years, columns, axis=0))
+
+    index = pd.MultiIndex.from_product([_to_datetime(starts), panel.columns], names=['start', 'scheme_code'])
+    return pd.DataFrame({'invested': paid, 'value': value.ravel(), 'absolute_return': value.ravel() / paid - 1,
+                         'xirr': rates}, index=index)
+
+
+def summary(panel, periods=(1, 3, 5), risk_free=0.0):
+    """
+    trailing returns, CAGR, volatility, max drawdown, Sharpe and Sortino of every scheme
+    :param panel: NAV panel
+    :param periods: years of the trailing windows
+    :param risk_free: annual risk free rate eg- 0.065
+    :return: Dataframe with one row per scheme
+    """
+    return pd.concat([trailing_returns(panel, periods), cagr(panel), volatility(panel), max_drawdown(panel),
+                      sharpe_ratio(panel, risk_free), sortino_ratio(panel, risk_free)], axis=1)
@@ -0,0 +1,402 @@
+import asyncio
+import datetime
+from functools import partial
+from .utils import Utilities, is_holiday, get_today, get_friday, render_response, get_codes, \
+    get_balance_units_value, get_returns, get_date_range
+from .parsers import parse_scheme_details, parse_historical_nav, parse_scheme_performance, parse_amc_profile, \
+    parse_average_aum
+from .snapshot import get_snapshot
+from .transport import AsyncTransport
+from .nav_history import NavHistory
+
+
+class AsyncMftool:
+    """
+    asyncio counterpart of Mftool, every fetch method is awaitable and runs on one
+    AsyncTransport, a pooled httpx.AsyncClient with the timeouts and retries of Transport
+
+    >>> async with AsyncMftool() as mf:
+    ...     quote = await mf.get_scheme_quote('119597')
+    """
+    def __init__(self, nav_ttl=None, max_connections=100, timeout=(5, 30), transport=None):
+        """
+        :param nav_ttl: seconds to reuse the shared NAVAll.txt snapshot before revalidating it,
+                default 15 minutes; the snapshot is always revalidated after AMFI's daily publish time
+        :param max_connections: size of the connection pool, also the limit of concurrent requests
+        :param timeout: (connect, read) seconds, or one number for both
+        :param transport: optional AsyncTransport, max_connections and timeout are ignored when given
+        """
+        self._transport = transport or AsyncTransport(timeout=timeout, pool_size=max_connections)
+        self._nav_ttl = nav_ttl
+        self._snapshot_lock = None
+        self._mftool = None
+        self._const = Utilities().values
+        # URL list
+        self._get_quote_url = self._const['get_quote_url']
+        self._get_scheme_url = self._const['get_scheme_url']
+        self._get_amc_details_url = self._const['get_amc_details_url']
+        self._get_open_ended_equity_scheme_url = self._const['get_open_ended_equity_scheme_url']
+        self._get_avg_aum = self._const['get_avg_aum_url']
+        self._open_ended_equity_category = self._const['open_ended_equity_category']
+        self._open_ended_debt_category = self._const['open_ended_debt_category']
+        self._open_ended_hybrid_category = self._const['open_ended_hybrid_category']
+        self._open_ended_solution_category = self._const['open_ended_solution_category']
+        self._open_ended_other_category = self._const['open_ended_other_category']
+        self._amc = self._const['amc']
+        self._user_agent = self._const['user_agent']
+        self._codes = get_codes()
+        self._snapshot = get_snapshot(self._get_quote_url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        closes the pooled connections
+        :return: None
+        """
+        await self._transport.aclose()
+
+    async def _get_json(self, url):
+        response = await self._transport.get(url)
+        return response.json()
+
+    async def _nav_snapshot(self):
+        """
+        returns the shared NAVAll.txt snapshot, revalidated if it is stale.
+        the download is awaited, the multi-MB parse runs in the default executor
+        :return: NavSnapshot
+        """
+        snapshot = self._snapshot
+        if snapshot.is_stale(self._nav_ttl):
+            if self._snapshot_lock is None:
+                self._snapshot_lock = asyncio.Lock()
+            async with self._snapshot_lock:
+                if snapshot.is_stale(self._nav_ttl):
+                    response = await self._transport.get(snapshot.url, headers=snapshot.request_headers())
+                    await asyncio.get_running_loop().run_in_executor(None, self._update_snapshot, response)
+        return snapshot
+
+    def _update_snapshot(self, response):
+        # the snapshot is shared with Mftool, hold its lock so threads refreshing it do not interleave
+        snapshot = self._snapshot
+        with snapshot._lock:
+            # a Mftool thread may have refreshed it during the download
+            if snapshot.is_stale(self._nav_ttl):
+                snapshot.update(response)
+
+    async def get_scheme_codes(self, as_json=False):
+        """
+        returns a dictionary with key as scheme code and value as scheme name.
+        served from the shared NAVAll.txt snapshot
+        :return: dict / json
+        """
+        scheme_info = dict((await self._nav_snapshot()).scheme_codes)
+        return render_response(scheme_info, as_json)
+
+    async def get_available_schemes(self, amc_name):
+        """
+        returns a dictionary with key as scheme code and value as scheme name for given amc.
+        :param amc_name: a string name of amc eg- Axis, ICICI, Reliance
+        :return: dict / json
+        """
+        return (await self._nav_snapshot()).search_index().contains(amc_name)
+
+    async def search_schemes(self, query, limit=10, plan=None, option=None, as_json=False):
+        """
+        ranked search over scheme names and AMCs, supports prefixes, many words and typos
+        :param query: string eg- 'axis blue', 'hdfc flexi direct growth', 'mirae asest'
+        :param limit: maximum number of results, default 10
+        :param plan: optional 'Direct' or 'Regular'
+        :param option: optional 'Growth' or 'IDCW'
+        :param as_json: default false
+        :return: list of dict with scheme_code, scheme_name and score, best match first
+        """
+        result = (await self._nav_snapshot()).search_index().search(query, limit, plan, option)
+        return render_response(result, as_json)
+
+    async def is_valid_code(self, code):
+        """
+        check whether a given scheme code is correct or NOT
+        :param code: a string scheme code
+        :return: Boolean
+        """
+        if code:
+            return code in (await self._nav_snapshot()).scheme_codes
+        else:
+            return False
+
+    def is_code(self, code):
+        """
+        check whether a New scheme code is correct or NOT, only used with mf.history()
+        :param code: a string scheme code
+        :return: Boolean
+        """
+        if code:
+            return code in self._codes
+        else:
+            return False
+
+    async def get_scheme_quote(self, code, as_json=False):
+        """
+        gets the quote for a given scheme code
+        :param code: scheme code
+        :param as_json: default false
+        :return: dict or None
+        :raises: HTTPError
+        """
+        code = str(code)
+        if await self.is_valid_code(code):
+            scheme_info = (await self._nav_snapshot()).quote(code)
+            if scheme_info is None:
+                # a retired scheme of the bundled codes, not published in NAVAll.txt
+                return None
+            return render_response(scheme_info, as_json)
+        else:
+            return None
+
+    async def get_scheme_quotes(self, codes, as_json=False):
+        """
+        gets the quotes for many scheme codes from one NAVAll.txt snapshot
+        :param codes: list of scheme codes
+        :param as_json: default false
+        :return: dict with key as scheme code and value as quote dict, or None for an invalid code
+        :raises: HTTPError
+        """
+        snapshot = await self._nav_snapshot()
+        scheme_info = {}
+        for code in codes:
+            code = str(code)
+            scheme_info[code] = snapshot.quote(code)
+        return render_response(scheme_info, as_json)
+
+    async def get_scheme_details(self, code, as_json=False):
+        """
+        gets the scheme info for a given scheme code
+        :param code: scheme code
+        :param as_json: default false
+        :return: dict or None
+        :raises: HTTPError
+        """
+        code = str(code)
+        if await self.is_valid_code(code):
+            response = await self._get_json(self._get_scheme_url + code)
+            return render_response(parse_scheme_details(response), as_json)
+        else:
+            return None
+
+    async def get_scheme_historical_nav(self, code, as_json=False, as_Dataframe=False, as_history=False):
+        """
+        gets the scheme historical data till last updated for a given scheme code
+        :param code: scheme-code
+        :param as_json: default false
+        :param as_Dataframe: default false
+        :param as_history: default false, NavHistory with datetime64 dates and float64 NAVs
+        :return: dict or json or Dataframe or NavHistory or None
+        :raises: HTTPError
+        """
+        code = str(code)
+        if await self.is_valid_code(code):
+            response = await self._get_json(self._get_scheme_url + code)
+            if as_history is True:
+                return NavHistory.from_response(response)
+            return render_response(parse_historical_nav(response), as_json, as_Dataframe)
+        else:
+            return None
+
+    async def get_scheme_historical_nav_for_dates(self, code, start_date, end_date, as_json=False,
+                                                  as_dataframe=False):
+        """
+        gets the scheme historical data between start_date and end_date for a given scheme code
+        :param start_date: string '%d-%m-%Y'
+        :param end_date: string '%d-%m-%Y'
+        :param code: scheme code
+        :param as_json: default false
+        :param as_dataframe: default false
+        :return: dict or None
+        :raises: HTTPError
+        """
+        code = str(code)
+        if await self.is_valid_code(code):
+            start_date = datetime.datetime.strptime(start_date, '%d-%m-%Y').date()
+            end_date = datetime.datetime.strptime(end_date, '%d-%m-%Y').date()
+            response = await self._get_json(self._get_scheme_url + code)
+            scheme_info = parse_scheme_details(response)
+            data = get_date_range(response['data'], start_date, end_date)
+            if len(data) == 0:
+                data.append({'Data is NOT available for selected range'})
+            scheme_info.update(data=data)
+            return render_response(scheme_info, as_json, as_dataframe)
+        else:
+            return None
+
+    async def calculate_balance_units_value(self, code, balance_units, as_json=False):
+        """
+        gets the market value of your balance units for a given scheme code
+        :param code: scheme code
+        :param balance_units: balance units
+        :param as_json: default false
+        :return: dict or None
+        """
+        code = str(code)
+        quote = await self.get_scheme_quote(code)
+        if quote is not None:
+            scheme_info = get_balance_units_value(quote, balance_units)
+            return render_response(scheme_info, as_json)
+        else:
+            return None
+
+    async def calculate_returns(self, code, balanced_units, monthly_sip, investment_in_months, as_json=False):
+        """
+        gets the market value of your balance units for a given scheme code
+        :param code: scheme-code,
+        :param balanced_units : current balance units
+        :param monthly_sip: monthly investment in scheme
+        :param investment_in_months: months
+        :param as_json: default false
+        :return: dict or None
+        """
+        code = str(code)
+        quote = await self.get_scheme_quote(code)
+        if quote is not None:
+            scheme_info = get_returns(quote, balanced_units, monthly_sip, investment_in_months)
+            return render_response(scheme_info, as_json)
+        else:
+            return None
+
+    async def get_open_ended_equity_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of open-ended equity schemes for all AMCs
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: json format
+        :raises: TransportError
+        """
+        scheme_performance = await self._get_scheme_performance([(1, self._open_ended_equity_category)],
+                                                                report_date)
+        return render_response(scheme_performance, as_json)
+
+    async def get_open_ended_debt_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of open-ended debt schemes for all AMCs
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: json format
+        :raises: TransportError
+        """
+        scheme_performance = await self._get_scheme_performance([(2, self._open_ended_debt_category)],
+                                                                report_date)
+        return render_response(scheme_performance, as_json)
+
+    async def get_open_ended_hybrid_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of open-ended hybrid schemes for all AMCs
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: json format
+        :raises: TransportError
+        """
+        scheme_performance = await self._get_scheme_performance([(3, self._open_ended_hybrid_category)],
+                                                                report_date)
+        return render_response(scheme_performance, as_json)
+
+    async def get_open_ended_solution_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of open-ended Solution-Oriented schemes for all AMCs
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: json format
+        :raises: TransportError
+        """
+        scheme_performance = await self._get_scheme_performance([(4, self._open_ended_solution_category)],
+                                                                report_date)
+        return render_response(scheme_performance, as_json)
+
+    async def get_open_ended_other_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of open-ended index and FoF schemes for all AMCs
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: json format
+        :raises: TransportError
+        """
+        scheme_performance = await self._get_scheme_performance([(5, self._open_ended_other_category)],
+                                                                report_date)
+        return render_response(scheme_performance, as_json)
+
+    async def get_all_open_ended_scheme_performance(self, report_date=None, as_json=False):
+        """
+        gets the daily performance of all open-ended schemes for all AMCs in one batch
+        :param report_date: date in 'DD-MMM-YYYY' format, if None then it will take last working day
+        :return: dict with key as scheme type eg- 'Equity', 'Debt' and value as performance by sub-category
+        :raises: TransportError
+        """
+        groups = [('Equity', 1, self._open_ended_equity_category),
+                  ('Debt', 2, self._open_ended_debt_category),
+                  ('Hybrid', 3, self._open_ended_hybrid_category),
+                  ('Solution Oriented', 4, self._open_ended_solution_category),
+                  ('Other', 5, self._open_ended_other_category)]
+        performance = await self._get_scheme_performance([(category, sub) for _, category, sub in groups],
+                                                         report_date)
+        scheme_performance = {}
+        for name, _, subCategory in groups:
+            scheme_performance[name] = {subCategory[key]: performance[subCategory[key]] for key in subCategory}
+        return render_response(scheme_performance, as_json)
+
+    async def _get_scheme_performance(self, categories, report_date=None):
+        if not report_date:
+            report_date = get_friday() if is_holiday() else get_today()
+        jobs = [(category, key, subCategory[key]) for category, subCategory in categories for key in subCategory]
+        results = await asyncio.gather(*[self._get_daily_scheme_performance(report_date, category, key)
+                                         for category, key, _ in jobs])
+        return {name: result for (_, _, name), result in zip(jobs, results)}
+
+    async def _get_daily_scheme_performance(self, report_date, category, key):
+        data = {"maturityType": 1, "category": category, "subCategory": int(key), "mfid": 0,
+                "reportDate": report_date}
+        response = await self._transport.post(self._get_open_ended_equity_scheme_url, json=data)
+        return parse_scheme_performance(response.json())
+
+    async def get_all_amc_profiles(self, as_json=True):
+        """
+        gets profiles for all Fund houses
+        :return: json format
+        :raises: HTTPError
+        """
+        async def get_amc_profile(amc):
+            response = await self._transport.post(self._get_amc_details_url, data={'Id': amc})
+            return parse_amc_profile(response.text)
+        amc_profiles = await asyncio.gather(*[get_amc_profile(amc) for amc in self._amc])
+        return render_response(list(amc_profiles), as_json)
+
+    async def get_average_aum(self, year_quarter, as_json=True):
+        """
+        gets the Avearage AUM data for all Fund houses
+        :param as_json: True / False
+        :param year_quarter: string 'July - September 2020'
+        :return: json format
+        :raises: HTTPError
+        """
+        response = await self._transport.post(self._get_avg_aum, headers=self._user_agent,
+                                              data={"AUmType": 'F', "Year_Quarter": year_quarter})
+        return render_response(parse_average_aum(response.text), as_json)
+
+    async def history(self, code, start=None, end=None, period='5d', as_dataframe=True):
+        """
+        awaitable Mftool.history(), yfinance has no asyncio API so it runs in the default executor
+        :return: Dataframe or JSON or None
+        """
+        return await self._run_sync('history', code, start=start, end=end, period=period,
+                                    as_dataframe=as_dataframe)
+
+    async def get_scheme_info(self, code, as_json=True):
+        """
+        awaitable Mftool.get_scheme_info(), yfinance has no asyncio API so it runs in the default executor
+        :return: JSON or None
+        """
+        return await self._run_sync('get_scheme_info', code, as_json=as_json)
+
+    async def _run_sync(self, name, *args, **kwargs):
+        if self._mftool is None:
+            from .mftool import Mftool
+            self._mftool = Mftool(nav_ttl=self._nav_ttl)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(getattr(self._mftool, name), *args, **kwargs))
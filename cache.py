@@ -0,0 +1,242 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# seconds each kind of data is cached for, None caches it until evicted
+DEFAULT_TTLS = {
+    'scheme': 60 * 60,             # mfapi.in scheme history, changes once a day
+    'performance': 60 * 60,        # AMFI fund performance, reports older than a week are final
+    'amc_profile': 24 * 60 * 60,   # AMC profile pages
+    'average_aum': 24 * 60 * 60,   # average AUM of a quarter not yet final, final quarters never change
+    'yfinance': 15 * 60,           # yfinance history and scheme info
+}
+_MISSING = object()
+
+
+class CacheStats:
+    """
+    hit / miss counters of a cache
+    """
+    __slots__ = ('hits', 'misses', 'sets', 'evictions')
+
+    def __init__(self):
+        self.hits = self.misses = self.sets = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'sets': self.sets, 'evictions': self.evictions,
+                'hit_rate': self.hit_rate}
+
+    def __repr__(self):
+        return "CacheStats(%s)" % ', '.join('%s=%s' % item for item in self.as_dict().items())
+
+
+class Cache:
+    """
+    base of the cache backends, subclasses implement _get, _set, delete and clear
+    """
+    def __init__(self):
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        :param key: string eg- 'scheme:119551'
+        :param default: returned on a miss
+        :return: cached value or default
+        """
+        value = self._get(key)
+        with self._stats_lock:
+            if value is _MISSING:
+                self.stats.misses += 1
+                return default
+            self.stats.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        :param key: string eg- 'scheme:119551'
+        :param value: value to cache
+        :param ttl: seconds to keep the value, None to keep it until evicted
+        :return: None
+        """
+        self._set(key, value, None if ttl is None else time.time() + ttl)
+        with self._stats_lock:
+            self.stats.sets += 1
+
+    def _evicted(self, count=1):
+        with self._stats_lock:
+            self.stats.evictions += count
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, expires):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    """
+    in-process cache keeping at most maxsize values, the least recently used is evicted first.
+    values are pickled like in the other backends, so every get returns a copy the caller may modify
+    """
+    def __init__(self, maxsize=512):
+        super().__init__()
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def _get(self, key):
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires is not None and expires <= time.time():
+                del self._values[key]
+                return _MISSING
+            self._values.move_to_end(key)
+        return pickle.loads(value)
+
+    def _set(self, key, value, expires):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        evicted = 0
+        with self._lock:
+            self._values[key] = (expires, blob)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._evicted(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class SQLiteCache(Cache):
+    """
+    on-disk cache in a SQLite file, shared by processes and kept across restarts.
+    values are pickled, only use a file you trust
+    """
+    def __init__(self, path, maxsize=None):
+        """
+        :param path: SQLite database file
+        :param maxsize: optional maximum number of values, the oldest written are evicted first
+        """
+        super().__init__()
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                               "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, written REAL NOT NULL)")
+
+    def close(self):
+        self._conn.close()
+
+    def _get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            if row[1] is not None and row[1] <= time.time():
+                with self._conn:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return _MISSING
+        return pickle.loads(row[0])
+
+    def _set(self, key, value, expires):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        evicted = 0
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value, expires, written) VALUES (?, ?, ?, ?)",
+                               (key, blob, expires, time.time()))
+            if self.maxsize is not None:
+                evicted = self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY written DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,)).rowcount
+        if evicted:
+            self._evicted(evicted)
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+
+class RedisCache(Cache):
+    """
+    cache in Redis, or any client with Redis' get / set(px=) / delete / scan_iter methods.
+    values are pickled, only use a server you trust
+    """
+    def __init__(self, client, prefix='mftool:'):
+        """
+        :param client: eg- redis.Redis(host='localhost')
+        :param prefix: prefix of every key, clear() only deletes keys with this prefix
+        """
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, key):
+        blob = self.client.get(self.prefix + key)
+        if blob is None:
+            return _MISSING
+        return pickle.loads(blob)
+
+    def _set(self, key, value, expires):
+        px = None if expires is None else int((expires - time.time()) * 1000)
+        if px is not None and px <= 0:
+            self.client.delete(self.prefix + key)
+            return
+        self.client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), px=px)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in list(self.client.scan_iter(match=self.prefix + '*')):
+            self.client.delete(key)
+
+
+class NullCache(Cache):
+    """
+    cache which keeps nothing, every lookup is a miss
+    """
+    def _get(self, key):
+        return _MISSING
+
+    def _set(self, key, value, expires):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
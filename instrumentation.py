@@ -0,0 +1,210 @@
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+
+# CallStats of the public Mftool call running in this thread or task, None when not instrumented
+_current = ContextVar('mftool_call_stats', default=None)
+
+
+class CallStats:
+    """
+    costs of one public Mftool call, seconds are wall clock. requests sent by worker threads of the
+    batched methods are included, so fetch_time and parse_time may add up to more than duration
+    """
+    __slots__ = ('method', 'duration', 'fetch_time', 'requests', 'bytes', 'cache_hits', 'cache_misses',
+                 'parse_time', 'render_time', 'result_size', 'error', '_lock')
+
+    def __init__(self, method):
+        self.method = method
+        self.duration = self.fetch_time = self.parse_time = self.render_time = 0.0
+        self.requests = self.bytes = self.cache_hits = self.cache_misses = 0
+        self.result_size = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, field, value):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + value)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__[:-1]}
+
+    def __repr__(self):
+        return "CallStats(%s)" % ', '.join('%s=%r' % item for item in self.as_dict().items())
+
+
+def current():
+    """
+    :return: CallStats of the instrumented call in progress, or None
+    """
+    return _current.get()
+
+
+def _size(result):
+    """
+    rows of a Dataframe, entries under 'data' of a dict which has them eg- NAVs of a historical nav,
+    items of any other dict or list, characters of a json string, else None
+    """
+    if isinstance(result, dict) and isinstance(result.get('data'), (list, dict)):
+        result = result['data']
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def instrumented(method):
+    """
+    decorates a public Mftool method to report a CallStats to the Mftool metrics after every call.
+    calls made while another instrumented call is in progress are part of the outer call.
+    with the default NullMetrics the method is called directly
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self._metrics
+        if not metrics.enabled or _current.get() is not None:
+            return method(self, *args, **kwargs)
+        stats = CallStats(name)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+            stats.result_size = _size(result)
+            return result
+        except BaseException as error:
+            stats.error = type(error).__name__
+            raise
+        finally:
+            stats.duration = time.perf_counter() - start
+            _current.reset(token)
+            metrics.record(stats)
+    return wrapper
+
+
+def timed(field):
+    """
+    decorates a function to add its run time to a field of the current CallStats eg- 'parse_time'
+    :param field: CallStats field
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.add(field, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def propagate(function):
+    """
+    binds a function to the current CallStats, so the costs of its calls in executor threads are reported
+    :param function: callable run by a ThreadPoolExecutor
+    :return: callable
+    """
+    stats = _current.get()
+    if stats is None:
+        return function
+
+    def run(*args, **kwargs):
+        token = _current.set(stats)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+class Metrics:
+    """
+    receives the CallStats of every public Mftool call, subclasses implement record
+    """
+    enabled = True
+
+    def record(self, stats):
+        """
+        called after every public method call, from the calling thread. keep it fast
+        :param stats: CallStats
+        :return: None
+        """
+        raise NotImplementedError
+
+
+class NullMetrics(Metrics):
+    """
+    default, nothing is measured
+    """
+    enabled = False
+
+    def record(self, stats):
+        pass
+
+
+class CallbackMetrics(Metrics):
+    """
+    passes every CallStats to a callable eg- Mftool(metrics=print)
+    """
+    def __init__(self, callback):
+        self.callback = callback
+
+    def record(self, stats):
+        self.callback(stats)
+
+
+class PrometheusMetrics(Metrics):
+    """
+    exports the CallStats as Prometheus metrics labelled by method, needs prometheus_client
+    """
+    def __init__(self, registry=None, namespace='mftool'):
+        """
+        :param registry: prometheus_client CollectorRegistry, default the global REGISTRY
+        :param namespace: prefix of the metric names
+        """
+        from .utils import import_optional
+        prometheus = import_optional('prometheus_client', 'prometheus')
+        registry = registry if registry is not None else prometheus.REGISTRY
+        labels = ['method']
+        self.duration = prometheus.Histogram('call_seconds', 'Duration of Mftool calls', labels,
+                                             namespace=namespace, registry=registry)
+        self.fetch_time = prometheus.Histogram('fetch_seconds', 'Time waiting for HTTP responses per call',
+                                               labels, namespace=namespace, registry=registry)
+        self.parse_time = prometheus.Histogram('parse_seconds', 'Time parsing responses per call', labels,
+                                               namespace=namespace, registry=registry)
+        self.render_time = prometheus.Histogram('render_seconds', 'Time rendering json or Dataframes per call',
+                                                labels, namespace=namespace, registry=registry)
+        self.requests = prometheus.Counter('requests', 'HTTP requests sent', labels, namespace=namespace,
+                                           registry=registry)
+        self.bytes = prometheus.Counter('downloaded_bytes', 'Bytes of HTTP response bodies', labels,
+                                        namespace=namespace, registry=registry)
+        self.cache_hits = prometheus.Counter('cache_hits', 'Cache hits', labels, namespace=namespace,
+                                             registry=registry)
+        self.cache_misses = prometheus.Counter('cache_misses', 'Cache misses', labels, namespace=namespace,
+                                               registry=registry)
+        self.result_size = prometheus.Summary('result_size', 'Rows or items returned per call', labels,
+                                              namespace=namespace, registry=registry)
+        self.errors = prometheus.Counter('errors', 'Calls which raised', labels + ['error'],
+                                         namespace=namespace, registry=registry)
+
+    def record(self, stats):
+        method = stats.method
+        self.duration.labels(method).observe(stats.duration)
+        self.fetch_time.labels(method).observe(stats.fetch_time)
+        self.parse_time.labels(method).observe(stats.parse_time)
+        self.render_time.labels(method).observe(stats.render_time)
+        self.requests.labels(method).inc(stats.requests)
+        self.bytes.labels(method).inc(stats.bytes)
+        self.cache_hits.labels(method).inc(stats.cache_hits)
+        self.cache_misses.labels(method).inc(stats.cache_misses)
+        if stats.result_size is not None:
+            self.result_size.labels(method).observe(stats.result_size)
+        if stats.error is not None:
+            self.errors.labels(method, stats.error).inc()
@@ -0,0 +1,80 @@
+from .utils import import_optional
+from .instrumentation import timed
+
+
+class NavHistory:
+    """
+    compact NAV history of one scheme, dates as a datetime64 array and NAVs as a float64 array, oldest first
+    """
+    __slots__ = ('scheme_code', 'scheme_name', 'fund_house', 'scheme_type', 'scheme_category', 'dates', 'navs')
+
+    def __init__(self, scheme_code, scheme_name, fund_house, scheme_type, scheme_category, dates, navs):
+        """
+        :param dates: numpy datetime64[s] array, oldest first
+        :param navs: numpy float64 array
+        """
+        self.scheme_code = scheme_code
+        self.scheme_name = scheme_name
+        self.fund_house = fund_house
+        self.scheme_type = scheme_type
+        self.scheme_category = scheme_category
+        self.dates = dates
+        self.navs = navs
+
+    @classmethod
+    @timed('parse_time')
+    def from_response(cls, response):
+        """
+        builds the history from a mfapi.in scheme response, or a NAV store record
+        :param response: parsed json of api.mfapi.in/mf/<code>
+        :return: NavHistory
+        """
+        import numpy as np
+        meta = response['meta']
+        data = response['data']
+        # rows are latest first as 'dd-mm-YYYY', reorder to ISO text which numpy parses in bulk
+        dates = np.array([row['date'][6:10] + '-' + row['date'][3:5] + '-' + row['date'][0:2]
+                          for row in reversed(data)], dtype='datetime64[s]')
+        navs = np.array([row['nav'] for row in reversed(data)], dtype='float64')
+        return cls(str(meta['scheme_code']), meta['scheme_name'], meta['fund_house'], meta['scheme_type'],
+                   meta['scheme_category'], dates, navs)
+
+    def __len__(self):
+        return len(self.navs)
+
+    def __repr__(self):
+        if not len(self):
+            return "NavHistory(%s, %s, empty)" % (self.scheme_code, self.scheme_name)
+        return "NavHistory(%s, %s, %d NAVs %s to %s)" % (self.scheme_code, self.scheme_name, len(self),
+                                                         str(self.dates[0])[:10], str(self.dates[-1])[:10])
+
+    @property
+    def latest(self):
+        """
+        :return: tuple of the latest date and NAV, or None for an empty history
+        """
+        if not len(self):
+            return None
+        return self.dates[-1], self.navs[-1]
+
+    def to_series(self):
+        """
+        :return: float64 Series indexed by date, sharing the NAV array
+        """
+        import pandas as pd
+        return pd.Series(self.navs, index=pd.DatetimeIndex(self.dates, name='date'), name=self.scheme_code,
+                         copy=False)
+
+    def to_frame(self):
+        """
+        :return: Dataframe with a float64 nav column indexed by date, sharing the NAV array
+        """
+        return self.to_series().to_frame('nav')
+
+    def to_arrow(self):
+        """
+        :return: pyarrow Table with date and nav columns, sharing the arrays
+        """
+        pa = import_optional('pyarrow', 'arrow')
+        return pa.table({'date': pa.array(self.dates), 'nav': pa.array(self.navs)},
+                        metadata={'scheme_code': self.scheme_code, 'scheme_name': self.scheme_name})
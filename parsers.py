@@ -0,0 +1,173 @@
+import datetime
+from collections import namedtuple
+from .utils import get_52_week_high_low
+from .instrumentation import timed
+
+
+# one scheme of NAVAll.txt, amc and the scheme type / category come from the section headers above it.
+# raw_nav and raw_date keep the text as published by AMFI, nav and date are None when it does not parse eg- 'N.A.'
+NavRecord = namedtuple('NavRecord', ['scheme_code', 'isin_growth', 'isin_reinvestment', 'scheme_name', 'nav',
+                                     'date', 'amc', 'scheme_type', 'scheme_category', 'raw_nav', 'raw_date'])
+
+
+def parse_nav_all(lines):
+    """
+    incrementally parses AMFI NAVAll.txt into NavRecord, one line at a time
+    :param lines: iterable of str lines eg- response.iter_lines(decode_unicode=True)
+    :return: generator of NavRecord
+    """
+    amc = scheme_type = scheme_category = None
+    dates = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if ";" not in line:
+            # section header, 'Open Ended Schemes(Debt Scheme - Banking and PSU Fund)' or an AMC name
+            if line.endswith(")") and "(" in line:
+                scheme_type, _, scheme_category = line[:-1].partition("(")
+                scheme_type = scheme_type.strip()
+                scheme_category = scheme_category.strip()
+            else:
+                amc = line
+            continue
+        scheme = line.split(";")
+        if len(scheme) < 6 or not scheme[0].isdigit():
+            continue
+        try:
+            nav = float(scheme[4])
+        except ValueError:
+            nav = None
+        # every scheme of a file shares a handful of dates, parse each once
+        date = dates.get(scheme[5], False)
+        if date is False:
+            try:
+                date = datetime.datetime.strptime(scheme[5], '%d-%b-%Y').date()
+            except ValueError:
+                date = None
+            dates[scheme[5]] = date
+        yield NavRecord(scheme[0], scheme[1], scheme[2], scheme[3], nav, date, amc, scheme_type, scheme_category,
+                        scheme[4], scheme[5])
+
+
+@timed('parse_time')
+def nav_records_frame(records):
+    """
+    builds a columnar Dataframe from NavRecord, indexed by scheme code
+    :param records: iterable of NavRecord
+    :return: Dataframe with float nav and datetime64 date columns
+    """
+    import pandas as pd
+    df = pd.DataFrame.from_records(records, columns=NavRecord._fields)
+    df['nav'] = df['nav'].astype('float64')
+    df['date'] = pd.to_datetime(df['date'])
+    return df.drop(columns=['raw_nav', 'raw_date']).set_index('scheme_code')
+
+
+@timed('parse_time')
+def parse_scheme_details(response):
+    """
+    builds the scheme details from a mfapi.in scheme response
+    :param response: parsed json of api.mfapi.in/mf/<code>
+    :return: dict
+    """
+    scheme_info = {}
+    scheme_data = response['meta']
+    scheme_info['fund_house'] = scheme_data['fund_house']
+    scheme_info['scheme_type'] = scheme_data['scheme_type']
+    scheme_info['scheme_category'] = scheme_data['scheme_category']
+    scheme_info['scheme_code'] = scheme_data['scheme_code']
+    scheme_info['scheme_name'] = scheme_data['scheme_name']
+    scheme_info['scheme_start_date'] = response['data'][int(len(response['data']) - 1)]
+    return scheme_info
+
+
+@timed('parse_time')
+def parse_historical_nav(response):
+    """
+    builds the scheme details with 52 week high / low and NAV history from a mfapi.in scheme response
+    :param response: parsed json of api.mfapi.in/mf/<code>
+    :return: dict
+    """
+    scheme_info = parse_scheme_details(response)
+    result = get_52_week_high_low(response['data'])
+    scheme_info['52_week_high'] = result['52_week_high']
+    scheme_info['52_week_low'] = result['52_week_low']
+    if response['data']:
+        scheme_info['data'] = response['data']
+    else:
+        scheme_info['data'] = "Underlying data not available"
+    return scheme_info
+
+
+@timed('parse_time')
+def parse_scheme_performance(response):
+    """
+    builds the scheme performance list from an AMFI fund performance response
+    :param response: parsed json of the fund performance api
+    :return: list, empty when AMFI has no report for the date
+    """
+    fund_performance = []
+    for result in response.get('data') or []:
+        scheme_details = {}
+        scheme_details['scheme_name'] = result['schemeName']
+        scheme_details['benchmark'] = result['benchmark']
+        scheme_details['latest NAV- Regular'] = result['navRegular']
+        scheme_details['latest NAV- Direct'] = result['navDirect']
+        scheme_details['1-Year Return(%)- Regular'] = result['return1YearRegular']
+        scheme_details['1-Year Return(%)- Direct'] = result['return1YearDirect']
+        scheme_details['3-Year Return(%)- Regular'] = result['return3YearRegular']
+        scheme_details['3-Year Return(%)- Direct'] = result['return3YearDirect']
+        scheme_details['5-Year Return(%)- Regular'] = result['return5YearRegular']
+        scheme_details['5-Year Return(%)- Direct'] = result['return5YearDirect']
+        fund_performance.append(scheme_details)
+    return fund_performance
+
+
+def table_rows(text):
+    """
+    yields the cell texts of every row in the table bodies of a page, each row's cells selected once.
+    parses with lxml when it is installed, BeautifulSoup's html.parser otherwise
+    :param text: html of the page
+    :return: generator of list of str
+    """
+    try:
+        import lxml.html
+    except ImportError:
+        from bs4 import BeautifulSoup
+        for row in BeautifulSoup(text, 'html.parser').select("table tbody tr"):
+            yield [cell.get_text() for cell in row.find_all('td')]
+        return
+    if not text or not text.strip():
+        return
+    for row in lxml.html.document_fromstring(text).iterfind('.//table//tbody//tr'):
+        yield [cell.text_content() for cell in row.iter('td')]
+
+
+@timed('parse_time')
+def parse_amc_profile(text):
+    """
+    builds the AMC profile from an AMFI AMC profile page
+    :param text: html of the page
+    :return: dict
+    """
+    amc_details = {}
+    for cells in table_rows(text):
+        if len(cells) > 1:
+            amc_details[cells[0]] = cells[1].strip()
+    return amc_details
+
+
+@timed('parse_time')
+def parse_average_aum(text):
+    """
+    builds the average AUM of all fund houses from an AMFI average AUM page
+    :param text: html of the page
+    :return: list
+    """
+    all_funds_aum = []
+    for cells in table_rows(text):
+        if len(cells) > 3:
+            all_funds_aum.append({'Fund Name': cells[1].strip(), 'AAUM Overseas': cells[2].strip(),
+                                  'AAUM Domestic': cells[3].strip()})
+    return all_funds_aum
@@ -0,0 +1,439 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict, OrderedDict
+from itertools import groupby
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# weight of a query token matching a scheme token exactly, by prefix, or with a typo
+EXACT, PREFIX, FUZZY = 3.0, 2.0, 1.0
+# number of recent search results kept, autocomplete repeats the same prefixes
+CACHE_SIZE = 1024
+# ways of reading a query with joined or split words which are searched, eg- 'blue chip' and 'bluechip'
+MAX_VARIANTS = 8
+# shortest part of a query word split in two, so that 'sbi' is not read as 's' 'bi'
+MIN_SPLIT = 3
+
+
+def tokenize(text):
+    """
+    splits a scheme name or query into lowercase alphanumeric tokens
+    :param text: string
+    :return: list
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def get_plan(tokens):
+    if 'direct' in tokens:
+        return 'Direct'
+    if 'regular' in tokens:
+        return 'Regular'
+    return None
+
+
+def get_option(tokens):
+    if 'growth' in tokens:
+        return 'Growth'
+    if 'idcw' in tokens or 'dividend' in tokens:
+        return 'IDCW'
+    return None
+
+
+def _unique(docs):
+    # drops the repeats of a sorted stream
+    last = None
+    for doc in docs:
+        if doc != last:
+            yield doc
+            last = doc
+
+
+def _trigrams(token):
+    token = '$' + token + '$'
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    optimal string alignment distance, so a swap of two letters counts as one typo
+    :param a: string
+    :param b: string
+    :param limit: distances above limit are not computed exactly
+    :return: int, limit + 1 when above limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SchemeSearchIndex:
+    """
+    inverted index over scheme names and AMCs supporting prefix, multi-token
+    and typo tolerant queries with ranked results
+    """
+    def __init__(self, schemes):
+        """
+        :param schemes: iterable of (scheme code, scheme name, amc or None)
+        """
+        schemes = list(schemes)
+        # schemes are numbered by rank, shorter names first, so every posting list is in rank order
+        # and a query can stop once it has found its best results
+        order = sorted(range(len(schemes)), key=lambda i: (len(schemes[i][1]), schemes[i][1]))
+        self._codes = []
+        self._names = []
+        self._lower_names = []
+        self._plans = []
+        self._options = []
+        self._doc_tokens = []
+        # position of every document among the schemes, contains() returns schemes in the order they were given
+        self._positions = order
+        postings = defaultdict(list)
+        for doc, position in enumerate(order):
+            code, name, amc = schemes[position]
+            tokens = set(tokenize(name))
+            self._codes.append(code)
+            self._names.append(name)
+            self._lower_names.append(name.lower())
+            self._plans.append(get_plan(tokens))
+            self._options.append(get_option(tokens))
+            if amc:
+                tokens.update(tokenize(amc))
+            self._doc_tokens.append(frozenset(tokens))
+            for token in tokens:
+                postings[token].append(doc)
+        self._postings = dict(postings)
+        self._schemes = [(code, name, name.lower()) for code, name, _ in schemes]
+        self._vocabulary = sorted(self._postings)
+        # running total of postings over the sorted vocabulary, sizes a prefix match in O(log n)
+        self._cumulative = [0]
+        for token in self._vocabulary:
+            self._cumulative.append(self._cumulative[-1] + len(self._postings[token]))
+        trigrams = defaultdict(list)
+        for token in self._vocabulary:
+            for trigram in _trigrams(token):
+                trigrams[trigram].append(token)
+        self._trigrams = dict(trigrams)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def from_scheme_codes(cls, scheme_codes):
+        """
+        builds the index from a dict of scheme code and scheme name eg- bundled scheme_codes.json
+        :param scheme_codes: dict
+        :return: SchemeSearchIndex
+        """
+        return cls((code, name, None) for code, name in scheme_codes.items())
+
+    def __len__(self):
+        return len(self._codes)
+
+    def _prefix_range(self, token):
+        start = bisect_left(self._vocabulary, token)
+        stop = bisect_left(self._vocabulary, token + '\uffff', start)
+        return start, stop
+
+    def _selectivity(self, token):
+        start, stop = self._prefix_range(token)
+        return self._cumulative[stop] - self._cumulative[start]
+
+    def _fuzzy(self, token):
+        """
+        returns the vocabulary tokens within one typo (two for longer tokens) of token
+        :param token: lowercase query token
+        :return: dict of vocabulary token and weight
+        """
+        limit = 1 if len(token) <= 5 else 2
+        candidates = set()
+        for trigram in _trigrams(token):
+            candidates.update(self._trigrams.get(trigram, ()))
+        words = {}
+        for word in candidates:
+            distance = edit_distance(token, word, limit)
+            if distance <= limit:
+                words[word] = FUZZY * (1 - distance / float(len(token) + 1))
+        return words
+
+    def _match(self, token):
+        """
+        returns the score of every scheme matching one query token
+        :param token: lowercase query token
+        :return: dict of document and score
+        """
+        scores = {}
+        start, stop = self._prefix_range(token)
+        for word in self._vocabulary[start:stop]:
+            weight = EXACT if word == token else PREFIX
+            for doc in self._postings[word]:
+                if scores.get(doc, 0) < weight:
+                    scores[doc] = weight
+        if not scores:
+            for word, weight in self._fuzzy(token).items():
+                for doc in self._postings[word]:
+                    if scores.get(doc, 0) < weight:
+                        scores[doc] = weight
+        return scores
+
+    def _score(self, doc, token, fuzzy):
+        best = 0
+        for word in self._doc_tokens[doc]:
+            if word == token:
+                return EXACT
+            if word.startswith(token):
+                best = PREFIX
+            elif best == 0 and word in fuzzy:
+                best = fuzzy[word]
+        return best
+
+    def _candidates(self, tokens):
+        # the most selective token gives the candidates, the others are checked on those schemes only.
+        # a token without prefix match is a typo, its fuzzy matches are broad so it is checked last
+        tokens = sorted(tokens, key=lambda token: self._selectivity(token) or self._cumulative[-1] + 1)
+        scores = self._match(tokens[0])
+        for token in tokens[1:]:
+            if not scores:
+                break
+            fuzzy = self._fuzzy(token) if self._selectivity(token) == 0 else {}
+            matched = {}
+            for doc, score in scores.items():
+                weight = self._score(doc, token, fuzzy)
+                if weight:
+                    matched[doc] = score + weight
+            scores = matched
+        return scores
+
+    def _variants(self, tokens):
+        """
+        returns the readings of the query tokens with joined or split words in which every token has
+        prefix matches eg- 'blue chip' also as 'bluechip', and 'bluechip' also as 'blue' 'chip'.
+        a joined word counts for the two tokens it replaces, each part of a split word for half
+        :param tokens: lowercase query tokens in query order
+        :return: list of dict of token and weight, empty when a token only has fuzzy matches
+        """
+        readings = []
+
+        def read(index, reading):
+            if len(readings) >= MAX_VARIANTS:
+                return
+            if index == len(tokens):
+                weights = {}
+                for token, weight in reading:
+                    weights[token] = max(weights.get(token, 0), weight)
+                if weights not in readings:
+                    readings.append(weights)
+                return
+            token = tokens[index]
+            if self._selectivity(token):
+                read(index + 1, reading + [(token, 1.0)])
+            if index + 1 < len(tokens) and token.isalpha() and tokens[index + 1].isalpha():
+                joined = token + tokens[index + 1]
+                if self._selectivity(joined):
+                    read(index + 2, reading + [(joined, 2.0)])
+            for cut in range(MIN_SPLIT, len(token) - MIN_SPLIT + 1):
+                if token[:cut] in self._postings and token[cut:] in self._postings:
+                    read(index + 1, reading + [(token[:cut], 0.5), (token[cut:], 0.5)])
+
+        read(0, [])
+        return readings
+
+    def _longer_words(self, token):
+        # vocabulary words starting with token, other than token itself
+        start, stop = self._prefix_range(token)
+        if start < stop and self._vocabulary[start] == token:
+            start += 1
+        return self._vocabulary[start:stop]
+
+    def _ranked(self, weights, limit, plan, option):
+        """
+        returns the best schemes of a query whose tokens all have prefix matches. every token matches a scheme
+        exactly or by prefix only, schemes are visited one score tier at a time in rank order, so the search
+        stops after limit results of the best tiers instead of scoring every scheme
+        :param weights: dict of token and weight
+        :return: list of (document, score)
+        """
+        tokens = list(weights)
+        tiers = []
+        for mask in range(1 << len(tokens)):
+            exact = [token for bit, token in enumerate(tokens) if mask >> bit & 1]
+            if all(token in self._postings for token in exact):
+                score = sum(weights[token] * (EXACT if token in exact else PREFIX) for token in tokens)
+                tiers.append((score, exact))
+        tiers.sort(key=lambda tier: -tier[0])
+        results = []
+        for score, group in groupby(tiers, key=lambda tier: tier[0]):
+            needed = limit - len(results)
+            found = []
+            for _, exact in group:
+                found.extend(self._tier(tokens, exact, needed, plan, option))
+            results.extend((doc, score) for doc in sorted(found)[:needed])
+            if len(results) >= limit:
+                break
+        return results
+
+    def _tier(self, tokens, exact, needed, plan, option):
+        """
+        returns the first needed documents, in rank order, where the exact tokens are words of the scheme
+        and the others only prefixes of its words
+        """
+        longer = {token: self._longer_words(token) for token in tokens if token not in exact}
+        sizes = {token: self._selectivity(token) - len(self._postings.get(token, ())) for token in longer}
+        # the shortest posting list covering the tier drives it
+        drivers = [(len(self._postings[token]), token) for token in exact] + [(sizes[token], token) for token in longer]
+        size, driver = min(drivers)
+        if size == 0:
+            return []
+        if driver in longer:
+            docs = _unique(heapq.merge(*[self._postings[word] for word in longer[driver]]))
+        else:
+            docs = iter(self._postings[driver])
+        # prefix matches of the other tokens as sets when they are not much larger than the driver,
+        # else they are checked on the words of each visited scheme
+        prefixed = {token: set().union(*[self._postings[word] for word in longer[token]])
+                    for token in longer if token != driver and sizes[token] <= 4 * size}
+        found = []
+        for doc in docs:
+            if plan is not None and self._plans[doc] != plan or option is not None and self._options[doc] != option:
+                continue
+            words = self._doc_tokens[doc]
+            for token in tokens:
+                if token in words:
+                    if token not in exact:
+                        break
+                elif token in exact:
+                    break
+                elif token in prefixed:
+                    if doc not in prefixed[token]:
+                        break
+                elif token != driver and not any(word.startswith(token) for word in words):
+                    break
+            else:
+                found.append(doc)
+                if len(found) == needed:
+                    break
+        return found
+
+    def search(self, query, limit=10, plan=None, option=None):
+        """
+        returns the best matching schemes, every query token has to match a scheme. words may be written
+        joined or split eg- 'sbi blue chip' finds 'SBI Bluechip Fund'
+        :param query: string eg- 'axis blue', 'hdfc flexi direct growth', 'mirae asest'
+        :param limit: maximum number of results
+        :param plan: optional 'Direct' or 'Regular'
+        :param option: optional 'Growth' or 'IDCW'
+        :return: list of dict with scheme_code, scheme_name and score, best match first
+        """
+        key = (query.lower(), limit, plan, option)
+        results = self._cached(key)
+        if results is not None:
+            return [dict(result) for result in results]
+        tokens = tokenize(query)
+        scores = {}
+        variants = self._variants(tokens) if tokens else []
+        for weights in variants:
+            for doc, score in self._ranked(weights, limit, plan, option):
+                if scores.get(doc, 0) < score:
+                    scores[doc] = score
+        if tokens and not variants:
+            # a typo, no reading of the query has prefix matches for all its tokens
+            scores = self._candidates(set(tokens))
+            if plan is not None or option is not None:
+                scores = {doc: score for doc, score in scores.items()
+                          if (plan is None or self._plans[doc] == plan)
+                          and (option is None or self._options[doc] == option)}
+        best = heapq.nsmallest(limit, scores, key=lambda doc: (-scores[doc], doc))
+        results = [{'scheme_code': self._codes[doc], 'scheme_name': self._names[doc], 'score': scores[doc]}
+                   for doc in best]
+        self._store(key, results)
+        return [dict(result) for result in results]
+
+    def _cached(self, key):
+        """
+        returns the cached results of a query or None
+        """
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _store(self, key, results):
+        """
+        caches the results of a query, evicting the least recently used one beyond CACHE_SIZE
+        """
+        with self._cache_lock:
+            self._cache[key] = results
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _containing(self, token):
+        """
+        returns the vocabulary tokens containing token anywhere, not only at their start
+        :param token: lowercase query token
+        :return: list
+        """
+        if len(token) < 3:
+            return [word for word in self._vocabulary if token in word]
+        # every trigram of token is a trigram of the words containing it, the rarest one gives the candidates
+        words = min((self._trigrams.get(token[i:i + 3], ()) for i in range(len(token) - 2)), key=len)
+        return [word for word in words if token in word]
+
+    def contains(self, text):
+        """
+        returns the schemes whose name contains text, case insensitive, in the order the schemes were given.
+        results are cached like those of search()
+        :param text: string eg- an AMC name
+        :return: dict with key as scheme code and value as scheme name
+        """
+        text = text.lower()
+        key = ('contains', text)
+        schemes = self._cached(key)
+        if schemes is None:
+            schemes = self._containing_text(text)
+            self._store(key, schemes)
+        return dict(schemes)
+
+    def _containing_text(self, text):
+        """
+        returns the schemes whose name contains lowercase text. candidates come from the index, so only
+        schemes sharing its tokens are compared, unless text is too common for the index to narrow them
+        :param text: lowercase string
+        :return: dict with key as scheme code and value as scheme name
+        """
+        tokens = tokenize(text)
+        words = {}
+        if tokens:
+            # text may start in the middle of a word eg- 'xis' of 'axis', so its first token matches anywhere
+            # in a word. the tokens after it follow a separator and start a word
+            words[tokens[0]] = self._containing(tokens[0])
+            for token in tokens[1:]:
+                start, stop = self._prefix_range(token)
+                words.setdefault(token, self._vocabulary[start:stop])
+        groups = sorted(words.values(), key=lambda matches: sum(len(self._postings[w]) for w in matches))
+        # text without tokens or as common as 'a' is found faster by comparing every name
+        if not groups or sum(len(self._postings[w]) for w in groups[0]) * 8 > len(self._names):
+            return {code: name for code, name, lower in self._schemes if text in lower}
+        docs = None
+        for matches in groups:
+            matched = set()
+            for word in matches:
+                matched.update(self._postings[word])
+            docs = matched if docs is None else docs & matched
+            if not docs:
+                return {}
+        return {self._codes[doc]: self._names[doc] for doc in sorted(docs, key=self._positions.__getitem__)
+                if text in self._lower_names[doc]}
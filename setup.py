@@ -13,7 +13,16 @@ setup(
     description="Library for getting real time Mutual funds info",
     license="MIT",
     keywords="amfi, quote, mutual-funds, funds, bse, nse, market, stock, stocks",
-    install_requires=['requests', 'bs4', 'httpx', 'pandas', 'yfinance', 'matplotlib','deprecated'],
+    install_requires=['requests', 'bs4', 'httpx', 'pandas', 'deprecated'],
+    extras_require={
+        'yfinance': ['yfinance'],
+        'plot': ['matplotlib'],
+        'arrow': ['pyarrow'],
+        'lxml': ['lxml'],
+        'http2': ['h2'],
+        'prometheus': ['prometheus_client'],
+        'all': ['yfinance', 'matplotlib', 'pyarrow', 'lxml', 'h2', 'prometheus_client'],
+    },
     url="https://github.com/NayakwadiS/mftool",
     packages=find_packages(),
     long_description=long_description,
@@ -0,0 +1,185 @@
+import threading
+import time
+import datetime
+from .parsers import parse_nav_all, nav_records_frame
+from .search import SchemeSearchIndex
+from .instrumentation import timed
+
+
+# AMFI publishes the day's NAVs in NAVAll.txt by late evening IST
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30), 'IST')
+AMFI_PUBLISH_TIME = datetime.time(21, 0)
+DEFAULT_TTL = 15 * 60
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def last_publish_time(now=None, publish_time=AMFI_PUBLISH_TIME):
+    """
+    returns the epoch timestamp of the latest AMFI daily publish time not after now
+    :param now: epoch seconds, default current time
+    :param publish_time: datetime.time in IST
+    :return: float
+    """
+    now = time.time() if now is None else now
+    current = datetime.datetime.fromtimestamp(now, IST)
+    published = datetime.datetime.combine(current.date(), publish_time, tzinfo=IST)
+    if published > current:
+        published -= datetime.timedelta(days=1)
+    return published.timestamp()
+
+
+class NavSnapshot:
+    """
+    parsed, in-memory copy of AMFI NAVAll.txt shared by all Mftool instances.
+    refreshed when the ttl expires or AMFI's daily publish time passes, using
+    conditional requests so an unchanged file is not downloaded again.
+    """
+    def __init__(self, url, ttl=DEFAULT_TTL, publish_time=AMFI_PUBLISH_TIME):
+        self.url = url
+        self.ttl = ttl
+        self.publish_time = publish_time
+        self.schemes = {}
+        self.scheme_codes = {}
+        self._search_index = None
+        self._etag = None
+        self._last_modified = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self, ttl=None, now=None):
+        """
+        check whether the snapshot has to be revalidated against AMFI
+        :param ttl: seconds, overrides the snapshot ttl
+        :param now: epoch seconds, default current time
+        :return: Boolean
+        """
+        if self._checked_at is None:
+            return True
+        now = time.time() if now is None else now
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and now - self._checked_at >= ttl:
+            return True
+        return self._checked_at < last_publish_time(now, self.publish_time)
+
+    def get(self, session, ttl=None):
+        """
+        returns the snapshot, refreshing it first if it is stale
+        :param session: Transport or requests session used for the download
+        :param ttl: seconds, overrides the snapshot ttl
+        :return: NavSnapshot
+        """
+        if self.is_stale(ttl):
+            with self._lock:
+                # another thread may have refreshed while we waited
+                if self.is_stale(ttl):
+                    self.refresh(session)
+        return self
+
+    def refresh(self, session):
+        """
+        revalidates the snapshot with If-None-Match / If-Modified-Since and
+        re-parses NAVAll.txt only when AMFI serves a new file
+        :param session: Transport or requests session used for the download
+        :return: None
+        :raises: HTTPError, ConnectionError, Timeout
+        """
+        response = session.get(self.url, headers=self.request_headers(), stream=True)
+        # streamed, the connection goes back to the pool only once the response is closed, also on a 304
+        try:
+            self.update(response)
+        finally:
+            response.close()
+
+    def request_headers(self):
+        """
+        returns the conditional request headers for revalidating the snapshot
+        :return: dict
+        """
+        headers = {}
+        if self.schemes:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        return headers
+
+    def update(self, response):
+        """
+        applies a NAVAll.txt response, requested with request_headers(), to the snapshot.
+        the body is parsed line by line, a streamed response is never held in memory as a whole
+        :param response: requests or httpx response
+        :return: None
+        :raises: HTTPError
+        """
+        if response.status_code == 304:
+            self._checked_at = time.time()
+            return
+        response.raise_for_status()
+        if hasattr(response, 'iter_content'):
+            # requests
+            response.encoding = response.encoding or 'utf-8'
+            self._load(response.iter_lines(decode_unicode=True))
+        else:
+            self._load(response.iter_lines())
+        self._etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+        self._checked_at = time.time()
+
+    @timed('parse_time')
+    def _load(self, lines):
+        # index keyed by the exact scheme code, so one parse serves every quote
+        schemes = {}
+        scheme_codes = {}
+        for record in parse_nav_all(lines):
+            schemes[record.scheme_code] = record
+            scheme_codes[record.scheme_code] = record.scheme_name
+        self.schemes = schemes
+        self.scheme_codes = scheme_codes
+        self._search_index = None
+
+    def quote(self, code):
+        """
+        returns the quote for an exact scheme code
+        :param code: a string scheme code
+        :return: dict or None
+        """
+        record = self.schemes.get(code)
+        if record is None:
+            return None
+        return {'scheme_code': record.scheme_code,
+                'scheme_name': record.scheme_name,
+                'last_updated': record.raw_date,
+                'nav': record.raw_nav}
+
+    def search_index(self):
+        """
+        returns the search index over the snapshot, built on first use after every reload
+        :return: SchemeSearchIndex
+        """
+        index = self._search_index
+        if index is None:
+            index = SchemeSearchIndex((r.scheme_code, r.scheme_name, r.amc) for r in self.schemes.values())
+            self._search_index = index
+        return index
+
+    def to_frame(self):
+        """
+        returns every scheme of the snapshot as a columnar Dataframe indexed by scheme code
+        :return: Dataframe
+        """
+        return nav_records_frame(self.schemes.values())
+
+
+def get_snapshot(url):
+    """
+    returns the process wide NavSnapshot for a NAVAll.txt url
+    :param url: NAVAll.txt url
+    :return: NavSnapshot
+    """
+    with _snapshots_lock:
+        snapshot = _snapshots.get(url)
+        if snapshot is None:
+            snapshot = _snapshots[url] = NavSnapshot(url)
+        return snapshot
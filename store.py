@@ -0,0 +1,111 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from .snapshot import IST, last_publish_time
+
+# seconds a refresh which did not find the latest NAV is trusted, mfapi.in ingests AMFI's file with a delay
+RETRY_TTL = 15 * 60
+
+
+def expected_nav_date(now=None):
+    """
+    returns the NAV date of AMFI's latest daily publish, the Friday before on weekends
+    :param now: epoch seconds, default current time
+    :return: datetime.date
+    """
+    published = datetime.datetime.fromtimestamp(last_publish_time(now), IST).date()
+    return published - datetime.timedelta(days=max(0, published.weekday() - 4))
+
+
+class NavStore:
+    """
+    SQLite store of mfapi.in scheme histories keyed by scheme code, so that
+    a refresh only downloads the NAVs after the last stored date
+    """
+    def __init__(self, path):
+        """
+        :param path: SQLite database file, ':memory:' for a private in-memory store
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS scheme ("
+                               "scheme_code TEXT PRIMARY KEY, meta TEXT NOT NULL, checked_at REAL NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS nav ("
+                               "scheme_code TEXT NOT NULL, date TEXT NOT NULL, nav TEXT NOT NULL, "
+                               "PRIMARY KEY (scheme_code, date)) WITHOUT ROWID")
+
+    def close(self):
+        self._conn.close()
+
+    def last_date(self, code):
+        """
+        returns the latest stored NAV date of a scheme
+        :param code: scheme code
+        :return: datetime.date or None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(date) FROM nav WHERE scheme_code = ?", (code,)).fetchone()
+        if row[0] is None:
+            return None
+        return datetime.date.fromisoformat(row[0])
+
+    def is_fresh(self, code, now=None, retry_ttl=RETRY_TTL):
+        """
+        check whether a scheme was refreshed after AMFI's latest daily publish time and holds the NAV
+        of that day. a refresh which did not find it, eg- on a holiday or before mfapi.in ingested it,
+        is only trusted for retry_ttl seconds
+        :param code: scheme code
+        :param now: epoch seconds, default current time
+        :param retry_ttl: seconds
+        :return: Boolean
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute("SELECT checked_at, (SELECT MAX(date) FROM nav WHERE scheme_code = ?) "
+                                     "FROM scheme WHERE scheme_code = ?", (code, code)).fetchone()
+        if row is None or row[0] < last_publish_time(now):
+            return False
+        if row[1] is not None and row[1] >= expected_nav_date(now).isoformat():
+            return True
+        return now - row[0] < retry_ttl
+
+    def append(self, code, response):
+        """
+        stores the meta and NAV rows of a mfapi.in response, rows already stored are replaced
+        :param code: scheme code
+        :param response: parsed json of api.mfapi.in/mf/<code>
+        :return: None
+        """
+        rows = [(code, _to_iso(dat['date']), dat['nav']) for dat in response.get('data') or []]
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO scheme (scheme_code, meta, checked_at) VALUES (?, ?, ?)",
+                               (code, json.dumps(response['meta']), time.time()))
+            self._conn.executemany("INSERT OR REPLACE INTO nav (scheme_code, date, nav) VALUES (?, ?, ?)", rows)
+
+    def get(self, code):
+        """
+        returns a stored scheme in the shape of a mfapi.in response, latest NAV first
+        :param code: scheme code
+        :return: dict or None
+        """
+        with self._lock:
+            meta = self._conn.execute("SELECT meta FROM scheme WHERE scheme_code = ?", (code,)).fetchone()
+            if meta is None:
+                return None
+            rows = self._conn.execute("SELECT date, nav FROM nav WHERE scheme_code = ? ORDER BY date DESC",
+                                      (code,)).fetchall()
+        return {'meta': json.loads(meta[0]),
+                'data': [{'date': _from_iso(date), 'nav': nav} for date, nav in rows]}
+
+
+def _to_iso(date):
+    # 'dd-mm-YYYY' to 'YYYY-mm-dd', which sorts by date in SQLite
+    return date[6:10] + '-' + date[3:5] + '-' + date[0:2]
+
+
+def _from_iso(date):
+    return date[8:10] + '-' + date[5:7] + '-' + date[0:4]
@@ -0,0 +1,135 @@
+"""
+    fixtures for the offline benchmarks, shaped like recorded AMFI and mfapi.in responses.
+    they are generated deterministically at full production size instead of being stored in the repo
+"""
+import datetime
+import random
+from mftool.utils import get_bundled_scheme_codes
+
+NAV_DATE = datetime.date(2026, 10, 16)
+CATEGORIES = ['Open Ended Schemes(Equity Scheme - Large Cap Fund)',
+              'Open Ended Schemes(Equity Scheme - Mid Cap Fund)',
+              'Open Ended Schemes(Debt Scheme - Banking and PSU Fund)',
+              'Open Ended Schemes(Debt Scheme - Liquid Fund)',
+              'Open Ended Schemes(Hybrid Scheme - Balanced Advantage)',
+              'Open Ended Schemes(Other Scheme - Index Funds)',
+              'Close Ended Schemes(Income)',
+              'Interval Fund Schemes(Income)']
+
+
+def scheme_codes(count):
+    """
+    :param count: number of schemes
+    :return: list of (code, name) of the newest bundled scheme codes, so is_valid_code accepts them
+    """
+    codes = get_bundled_scheme_codes()
+    return [(code, codes[code]) for code in sorted(codes, key=int)[-count:]]
+
+
+def nav_all(count=14000, seed=7):
+    """
+    NAVAll.txt of count schemes, grouped by category and AMC like AMFI's file, about 14000 schemes today
+    :return: str
+    """
+    rng = random.Random(seed)
+    lines = ['Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date', '']
+    schemes = scheme_codes(count)
+    per_category = len(schemes) // len(CATEGORIES) + 1
+    for index, category in enumerate(CATEGORIES):
+        lines += [category, '']
+        amc = None
+        for code, name in sorted(schemes[index * per_category:(index + 1) * per_category], key=lambda s: s[1]):
+            if name.split(' ')[0] != amc:
+                amc = name.split(' ')[0]
+                lines += ['', amc + ' Mutual Fund', '']
+            nav = 'N.A.' if rng.random() < 0.01 else '%.4f' % rng.uniform(8, 900)
+            lines.append('%s;INF%09dX;-;%s;%s;%s' % (code, int(code), name, nav, NAV_DATE.strftime('%d-%b-%Y')))
+        lines.append('')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def scheme_history(code, name, days=4500, seed=None):
+    """
+    mfapi.in response of a scheme with a NAV for every weekday, latest first. days=4500 is about 18 years
+    :return: dict
+    """
+    rng = random.Random(seed if seed is not None else int(code))
+    data = []
+    day = NAV_DATE
+    nav = 100.0
+    while len(data) < days:
+        if day.weekday() < 5:
+            data.append({'date': day.strftime('%d-%m-%Y'), 'nav': '%.5f' % nav})
+            nav /= 1 + rng.gauss(0.0004, 0.01)
+        day -= datetime.timedelta(days=1)
+    meta = {'fund_house': name.split(' ')[0] + ' Mutual Fund', 'scheme_type': 'Open Ended Schemes',
+            'scheme_category': 'Equity Scheme - Large Cap Fund', 'scheme_code': int(code), 'scheme_name': name}
+    return {'meta': meta, 'data': data, 'status': 'SUCCESS'}
+
+
+def fund_performance(sub_category, schemes=40):
+    """
+    body of the AMFI fund performance api for one sub-category
+    :return: dict
+    """
+    rng = random.Random(sub_category)
+    rows = []
+    for index in range(schemes):
+        row = {'schemeName': 'Scheme %d of sub-category %d' % (index, sub_category), 'benchmark': 'NIFTY 100 TRI',
+               'navRegular': round(rng.uniform(10, 900), 4), 'navDirect': round(rng.uniform(10, 900), 4)}
+        for years in (1, 3, 5):
+            for plan in ('Regular', 'Direct'):
+                row['return%dYear%s' % (years, plan)] = round(rng.uniform(-5, 40), 2)
+        rows.append(row)
+    return {'data': rows}
+
+
+def amc_profile(amc):
+    """
+    AMFI AMC profile page, a table of label and value rows inside the site layout
+    :return: str
+    """
+    rows = [('AMC Name', 'Fund House %d Mutual Fund' % amc), ('Setup Date', '16-Dec-1996'),
+            ('Incorporation Date', '07-Nov-1995'), ('Sponsor Name', 'Sponsor %d Limited' % amc),
+            ('Trustee Company', 'Trustee %d Private Limited' % amc), ('Chairman', 'Mr. A'), ('CEO', 'Mr. B'),
+            ('CIO', 'Ms. C'), ('Compliance Officer', 'Mr. D'), ('Investor Service Officer', 'Ms. E'),
+            ('Assistant', 'Mr. F'), ('Address', '%d, Nariman Point, Mumbai 400021' % amc),
+            ('Telephone', '022-66578000'), ('Fax', '022-66578181'), ('Email', 'service@amc%d.com' % amc),
+            ('Website', 'www.amc%d.com' % amc)]
+    body = ''.join('<tr><td>%s</td><td> %s </td></tr>' % row for row in rows)
+    return layout('<table class="table"><tbody>%s</tbody></table>' % body)
+
+
+def average_aum(funds=45, seed=3):
+    """
+    AMFI average AUM page of a quarter, one row per fund house with lakh formatted amounts
+    :return: str
+    """
+    rng = random.Random(seed)
+    body = ''.join('<tr><td>%d</td><td>Fund House %d Mutual Fund</td><td>%s</td><td>%s</td></tr>'
+                   % (index + 1, index, lakhs(rng.uniform(0, 5000)), lakhs(rng.uniform(100, 700000)))
+                   for index in range(funds))
+    head = '<thead><tr><th>Sr</th><th>Mutual Fund Name</th><th>AAUM Overseas</th><th>AAUM Domestic</th></tr></thead>'
+    return layout('<table class="table">%s<tbody>%s</tbody></table>' % (head, body))
+
+
+def lakhs(amount):
+    """
+    formats like AMFI's pages eg- 2,34,567.89
+    """
+    whole, fraction = ('%.2f' % amount).split('.')
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    return ','.join(([head] if head else []) + groups + [tail]) + '.' + fraction
+
+
+def layout(content):
+    """
+    wraps content in navigation and footer markup, the parsers have to skip it like on the live site
+    """
+    menu = ''.join('<li><a href="/page-%d">Menu item %d</a></li>' % (index, index) for index in range(120))
+    return ('<!DOCTYPE html><html><head><title>AMFI</title></head><body><nav><ul>%s</ul></nav>'
+            '<div class="content">%s</div><footer>%s</footer></body></html>' % (menu, content, menu))
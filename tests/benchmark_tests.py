@@ -0,0 +1,171 @@
+"""
+    offline benchmarks of the fetch methods, run against production sized fixtures served by a local
+    stand-in for AMFI and mfapi.in, so they need no network and measure mftool rather than the upstream.
+
+    with pytest-benchmark installed results can be saved and compared to catch regressions:
+        python -m pytest tests/benchmark_tests.py --benchmark-autosave
+        python -m pytest tests/benchmark_tests.py --benchmark-compare --benchmark-compare-fail=mean:20%
+    without it every benchmark is timed over MFTOOL_BENCH_ROUNDS rounds and printed, run with -s to see them
+"""
+import json
+import os
+import statistics
+import time
+from urllib.parse import parse_qs
+import pytest
+from mftool import Mftool
+from mftool.snapshot import NavSnapshot, get_snapshot
+import bench_fixtures
+from stand_in_server import StandInServer
+
+# timed rounds of every benchmark without pytest-benchmark
+ROUNDS = int(os.environ.get('MFTOOL_BENCH_ROUNDS', 5))
+# schemes of the batched historical NAV benchmark
+SCHEMES = int(os.environ.get('MFTOOL_BENCH_SCHEMES', 50))
+NAV_ALL_SCHEMES = 14000
+REPORT_DATE = '16-Oct-2026'
+QUARTER = 'April - June 2026'
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    class Benchmark:
+        """
+        the part of pytest-benchmark's fixture used here, times ROUNDS calls after a warm-up call and
+        prints latency and throughput of extra_info['items'] per second
+        """
+        def __init__(self, name):
+            self.name = name
+            self.extra_info = {}
+
+        def __call__(self, function, *args, **kwargs):
+            result = function(*args, **kwargs)
+            times = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                result = function(*args, **kwargs)
+                times.append(time.perf_counter() - start)
+            mean = statistics.mean(times)
+            print("\n%-55s min %9.2f ms  mean %9.2f ms  %11.1f items/s"
+                  % (self.name, min(times) * 1000, mean * 1000, self.extra_info.get('items', 1) / mean))
+            return result
+
+    @pytest.fixture
+    def benchmark(request):
+        return Benchmark(request.node.name)
+
+
+@pytest.fixture(scope='module')
+def server():
+    codes = bench_fixtures.scheme_codes(SCHEMES)
+    nav_all = bench_fixtures.nav_all(NAV_ALL_SCHEMES).encode('utf-8')
+    performance = {}
+    amc_pages = {}
+    aum_page = bench_fixtures.average_aum()
+
+    def fund_performance(request):
+        sub_category = json.loads(request['body'])['subCategory']
+        if sub_category not in performance:
+            performance[sub_category] = json.dumps(bench_fixtures.fund_performance(sub_category))
+        return 200, 'application/json', performance[sub_category]
+
+    def amc_profile(request):
+        amc = int(parse_qs(request['body'].decode())['Id'][0])
+        if amc not in amc_pages:
+            amc_pages[amc] = bench_fixtures.amc_profile(amc)
+        return 200, 'text/html', amc_pages[amc]
+
+    with StandInServer() as server:
+        server.route('/spages/NAVAll.txt', lambda request: (200, 'text/plain', nav_all))
+        for code, name in codes:
+            body = json.dumps(bench_fixtures.scheme_history(code, name))
+            server.route('/mf/' + code, lambda request, body=body: (200, 'application/json', body))
+        server.route('/api/amfi/fundperformance', fund_performance)
+        server.route('/modules/AMCProfileDetail', amc_profile)
+        server.route('/modules/AverageAUMDetails', lambda request: (200, 'text/html', aum_page))
+        server.codes = [code for code, _ in codes]
+        yield server
+
+
+def mftool(server, **kwargs):
+    """
+    Mftool sending every request to the stand-in, without caching so each round fetches and parses again
+    """
+    mf = Mftool(cache=False, **kwargs)
+    mf._get_quote_url = server.url + '/spages/NAVAll.txt'
+    mf._snapshot = get_snapshot(mf._get_quote_url)
+    mf._get_scheme_url = server.url + '/mf/'
+    mf._get_open_ended_equity_scheme_url = server.url + '/api/amfi/fundperformance'
+    mf._get_amc_details_url = server.url + '/modules/AMCProfileDetail'
+    mf._get_avg_aum = server.url + '/modules/AverageAUMDetails'
+    return mf
+
+
+def test_scheme_codes_download_and_parse(server, benchmark):
+    mf = mftool(server)
+
+    def scheme_codes():
+        mf._snapshot = NavSnapshot(mf._get_quote_url)
+        return mf.get_scheme_codes()
+    benchmark.extra_info['items'] = NAV_ALL_SCHEMES
+    assert len(benchmark(scheme_codes)) == NAV_ALL_SCHEMES
+
+
+def test_scheme_quotes_from_snapshot(server, benchmark):
+    mf = mftool(server)
+    mf.get_scheme_codes()
+    benchmark.extra_info['items'] = len(server.codes)
+    quotes = benchmark(lambda: [mf.get_scheme_quote(code) for code in server.codes])
+    assert all(quote['scheme_code'] == code for quote, code in zip(quotes, server.codes))
+
+
+@pytest.mark.parametrize('as_Dataframe', [False, True], ids=['dict', 'dataframe'])
+def test_scheme_historical_nav(server, benchmark, as_Dataframe):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = 1
+    result = benchmark(mf.get_scheme_historical_nav, server.codes[0], as_Dataframe=as_Dataframe)
+    assert len(result if as_Dataframe else result['data']) == 4500
+
+
+def test_schemes_historical_nav_batch(server, benchmark):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = len(server.codes)
+    result = benchmark(mf.get_schemes_historical_nav, server.codes, rate_limit=10000)
+    assert len(result['data']) == len(server.codes) and result['errors'] == {}
+
+
+@pytest.mark.parametrize('category', ['equity', 'debt', 'hybrid', 'solution', 'other'])
+def test_category_performance(server, benchmark, category):
+    mf = mftool(server)
+    method = getattr(mf, 'get_open_ended_%s_scheme_performance' % category)
+    benchmark.extra_info['items'] = len(getattr(mf, '_open_ended_%s_category' % category))
+    result = benchmark(method, REPORT_DATE)
+    assert all(len(schemes) == 40 for schemes in result.values())
+
+
+def test_all_open_ended_scheme_performance(server, benchmark):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = 39
+    result = benchmark(mf.get_all_open_ended_scheme_performance, REPORT_DATE)
+    assert sum(len(sub_categories) for sub_categories in result.values()) == 39
+
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_amc_profiles(server, benchmark):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = len(mf._amc)
+    profiles = benchmark(mf.get_all_amc_profiles, False)
+    assert len(profiles) == len(mf._amc) and all(len(profile) == 16 for profile in profiles)
+
+
+def test_average_aum(server, benchmark):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = 45
+    assert len(benchmark(mf.get_average_aum, QUARTER, False)) == 45
+
+
+def test_average_aum_range(server, benchmark):
+    mf = mftool(server)
+    benchmark.extra_info['items'] = 8
+    df = benchmark(mf.get_average_aum_range, 'July - September 2024', QUARTER)
+    assert len(df) == 8 * 45 and df.attrs['errors'] == {}
@@ -0,0 +1,174 @@
+"""
+    tests for the cache backends, the cached Mftool methods and request coalescing
+"""
+import copy
+import fnmatch
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from mftool import Mftool
+from mftool.cache import LRUCache, SQLiteCache, RedisCache
+from mftool.transport import SingleFlight
+
+SCHEME = {'meta': {'fund_house': 'DSP Mutual Fund', 'scheme_type': 'Open Ended Schemes',
+                   'scheme_category': 'Debt Scheme - Short Duration Fund', 'scheme_code': 101305,
+                   'scheme_name': 'DSP Short Term Fund - Regular Plan - IDCW'},
+          'data': [{'date': '17-10-2026', 'nav': '12.12120'}]}
+
+
+class FakeRedis:
+    """
+    the subset of the redis client used by RedisCache
+    """
+    def __init__(self):
+        self.values = {}
+
+    def get(self, name):
+        value, expires = self.values.get(name, (None, None))
+        if expires is not None and expires <= time.time():
+            return None
+        return value
+
+    def set(self, name, value, px=None):
+        self.values[name] = (value, None if px is None else time.time() + px / 1000.0)
+
+    def delete(self, name):
+        self.values.pop(name, None)
+
+    def scan_iter(self, match):
+        return [name for name in self.values if fnmatch.fnmatch(name, match)]
+
+
+class TestCacheBackends(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_backend(self, cache):
+        self.assertIsNone(cache.get('scheme:101305'))
+        cache.set('scheme:101305', SCHEME, ttl=60)
+        cache.set('average_aum:April - June 2020', [{'Fund Name': 'x'}])
+        cache.set('amc_profile:3', {'AMC Name': 'DSP'}, ttl=-1)
+        self.assertEqual(cache.get('scheme:101305'), SCHEME)
+        self.assertEqual(cache.get('average_aum:April - June 2020'), [{'Fund Name': 'x'}])
+        self.assertIsNone(cache.get('amc_profile:3'))
+        cache.delete('scheme:101305')
+        self.assertIsNone(cache.get('scheme:101305'))
+        cache.clear()
+        self.assertIsNone(cache.get('average_aum:April - June 2020'))
+        self.assertEqual((cache.stats.hits, cache.stats.misses, cache.stats.sets), (2, 4, 3))
+
+    def test_lru(self):
+        self.check_backend(LRUCache())
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_sqlite(self):
+        path = os.path.join(self.directory, 'cache.sqlite')
+        self.check_backend(SQLiteCache(path))
+        cache = SQLiteCache(path, maxsize=2)
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertEqual(cache.stats.evictions, 1)
+        # another process reads the same file
+        self.assertEqual(SQLiteCache(path).get('c'), 'c')
+
+    def test_redis(self):
+        client = FakeRedis()
+        self.check_backend(RedisCache(client))
+        RedisCache(client, prefix='other:').set('a', 1)
+        RedisCache(client).clear()
+        self.assertEqual(list(client.values), ['other:a'])
+
+
+class TestCachedMethods(unittest.TestCase):
+    def fetch_twice(self, mf):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = SCHEME
+        with mock.patch.object(mf._session, 'get', return_value=response) as get, \
+                mock.patch.object(mf, 'is_valid_code', return_value=True):
+            mf.get_scheme_details('101305')
+            nav = mf.get_scheme_historical_nav('101305')
+        self.assertEqual(nav['scheme_name'], SCHEME['meta']['scheme_name'])
+        return get.call_count
+
+    def test_scheme_history_cached(self):
+        mf = Mftool()
+        self.assertEqual(self.fetch_twice(mf), 1)
+        self.assertEqual(mf.get_cache_stats()['hits'], 1)
+        # a shared backend serves other Mftool objects
+        cache = LRUCache()
+        self.fetch_twice(Mftool(cache=cache))
+        self.assertEqual(self.fetch_twice(Mftool(cache=cache)), 0)
+
+    def test_results_are_copies(self):
+        mf = Mftool()
+        scheme = dict(SCHEME, data=[{'date': '17-10-2026', 'nav': '12.12120'}, {'date': '16-10-2026', 'nav': '12.1'}])
+        response = mock.Mock(status_code=200)
+        response.json.side_effect = lambda: copy.deepcopy(scheme)
+        with mock.patch.object(mf._session, 'get', return_value=response) as get, \
+                mock.patch.object(mf, 'is_valid_code', return_value=True):
+            first = mf.get_scheme_historical_nav('101305')
+            first['data'].reverse()
+            first['data'][0]['nav'] = 'x'
+            self.assertEqual(mf.get_scheme_historical_nav('101305')['data'], scheme['data'])
+            self.assertEqual(mf.get_scheme_details('101305')['scheme_start_date'], scheme['data'][-1])
+        self.assertEqual(get.call_count, 1)
+
+    def test_caching_disabled(self):
+        self.assertEqual(self.fetch_twice(Mftool(cache=False)), 2)
+        self.assertEqual(self.fetch_twice(Mftool(cache_ttls={'scheme': 0})), 2)
+
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_fetches_share_one_request(self):
+        mf = Mftool(cache=False)
+        release = threading.Event()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = SCHEME
+
+        def get(url, **kwargs):
+            release.wait(5)
+            return response
+
+        results = []
+        with mock.patch.object(mf._session, 'get', side_effect=get) as session_get, \
+                mock.patch.object(mf, 'is_valid_code', return_value=True):
+            threads = [threading.Thread(target=lambda: results.append(mf.get_scheme_historical_nav('101305')))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            deadline = time.time() + 5
+            while mf.get_cache_stats()['coalesced'] < 7 and time.time() < deadline:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(session_get.call_count, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result['data'] == SCHEME['data'] for result in results))
+        # the coalesced callers get copies they may modify
+        self.assertEqual(len({id(result['data']) for result in results}), 8)
+
+    def test_error_is_shared_and_not_kept(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', mock.Mock(side_effect=ValueError('upstream')))
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,27 @@
     This is a test module for testing
 """
 import unittest
+import asyncio
+import datetime
+import importlib.util
 import logging
 import json
+import os
+import subprocess
+import sys
+import requests
 import six
-from mftool import Mftool
+from unittest import mock
+from mftool import Mftool, AsyncMftool, NavHistory
+from mftool.snapshot import NavSnapshot, last_publish_time
+from mftool.parsers import NavRecord, parse_nav_all, nav_records_frame
+from mftool.utils import get_date_range, get_bundled_scheme_codes, get_52_week_high_low, get_quarters, \
+    is_quarter_final, is_report_final
+from mftool.search import SchemeSearchIndex
+from mftool.instrumentation import PrometheusMetrics
+from mftool.transport import Transport, AsyncTransport, CircuitBreaker, CircuitOpenError, UpstreamHTTPError, \
+    UpstreamTimeout, RateLimiter
+from mftool import analytics
 from utils import is_holiday, get_friday, get_today
 
 log = logging.getLogger('mftool')
@@ -36,6 +53,13 @@ class TestAPIs(unittest.TestCase):
         wrong_code = '1195'
         self.assertFalse(self.mftool.is_valid_code(wrong_code))
 
+    def test_is_code(self):
+        self.assertTrue(self.mftool.is_code('0P0000XVRM'))
+        self.assertFalse(self.mftool.is_code('0P0000XVR'))
+        self.assertEqual(self.mftool.validate_codes(['0P0000XVRM', 'wrong code']), [True, False])
+        self.assertEqual(self.mftool.get_code_name('0P0000XVRM'),
+                         'Franklin India Liquid Super Institutional Direct Weekly Dividend Payout')
+
     def test_get_scheme_quote(self):
         code = '101305'
         self.assertIsInstance(self.mftool.get_scheme_quote(code), dict)
@@ -86,20 +110,22 @@ class TestAPIs(unittest.TestCase):
         result = self.mftool.calculate_balance_units_value(code, 221)
         self.assertIsNotNone(result)
 
-    def test_get_scheme_historical_nav_year(self):
+    def test_get_scheme_historical_nav_for_year(self):
+        # get_scheme_historical_nav_year does not exist, a year is asked for with a date range
         code = '101305'
-        self.assertIsInstance(self.mftool.get_scheme_historical_nav_year(code, 2018), dict)
+        self.assertIsInstance(self.mftool.get_scheme_historical_nav_for_dates(code, '01-01-2018', '31-12-2018'), dict)
         # with json respomftool
-        self.assertIsInstance(self.mftool.get_scheme_historical_nav_year(code, 2018, as_json=True), str)
+        self.assertIsInstance(self.mftool.get_scheme_historical_nav_for_dates(code, '01-01-2018', '31-12-2018',
+                                                                              as_json=True), str)
         # with wrong code
         code = 'wrong code'
-        self.assertIsNone(self.mftool.get_scheme_historical_nav_year(code, 2018))
+        self.assertIsNone(self.mftool.get_scheme_historical_nav_for_dates(code, '01-01-2018', '31-12-2018'))
         # with code in 'int' format
         code = 101305
-        self.assertIsInstance(self.mftool.get_scheme_historical_nav_year(code, 2018), dict)
+        self.assertIsInstance(self.mftool.get_scheme_historical_nav_for_dates(code, '01-01-2018', '31-12-2018'), dict)
         # verify data present
-        result = self.mftool.get_scheme_historical_nav_year(code, 2018)
-        self.assertIsNotNone(result)
+        result = self.mftool.get_scheme_historical_nav_for_dates(code, '01-01-2018', '31-12-2018')
+        self.assertTrue(result['data'])
 
     def test_get_day(self):
         if is_holiday():
@@ -130,6 +156,697 @@ class TestAPIs(unittest.TestCase):
                                     'Small Cap': [],'Value': [],'ELSS': [],'Contra': [],'Dividend Yield': [],
                                     'Focused': []})
 
+class FakeResponse:
+    def __init__(self, text='', status_code=200, headers=None):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def iter_lines(self):
+        return iter(self.text.splitlines())
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+
+NAV_ALL = ("Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date\r\n"
+           "\r\n"
+           "Open Ended Schemes(Debt Scheme - Banking and PSU Fund)\r\n"
+           "\r\n"
+           "Aditya Birla Sun Life Mutual Fund\r\n"
+           "119551;INF209KA12Z1;INF209KA13Z9;Aditya Birla Sun Life Banking & PSU Debt Fund  - DIRECT - IDCW;106.2498;17-Oct-2026\r\n"
+           "101305;INF740K01NY4;-;DSP Short Term Fund - Regular Plan - IDCW;12.1212;17-Oct-2026\r\n")
+
+
+def loaded_snapshot():
+    """
+    NavSnapshot of NAV_ALL, so is_valid_code answers without downloading NAVAll.txt
+    """
+    snapshot = NavSnapshot('https://example.invalid/NAVAll.txt', ttl=None)
+    return snapshot.get(FakeSession([FakeResponse(NAV_ALL)]))
+
+
+class TestNavSnapshot(unittest.TestCase):
+    def test_snapshot_is_shared_and_revalidated(self):
+        snapshot = NavSnapshot('https://example.invalid/NAVAll.txt', ttl=60)
+        not_modified = FakeResponse(status_code=304)
+        session = FakeSession([FakeResponse(NAV_ALL, headers={'ETag': '"v1"'}), not_modified])
+        snapshot.get(session)
+        snapshot.get(session)
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(snapshot.scheme_codes['119551'],
+                         'Aditya Birla Sun Life Banking & PSU Debt Fund  - DIRECT - IDCW')
+        # expired ttl revalidates with the stored ETag and keeps the parsed file on 304
+        snapshot.get(session, ttl=0)
+        self.assertEqual(session.requests[-1], {'If-None-Match': '"v1"'})
+        self.assertIn('101305', snapshot.scheme_codes)
+        # the streamed 304 returns its connection to the pool
+        self.assertTrue(not_modified.closed)
+
+    def test_snapshot_quote_matches_exact_code(self):
+        snapshot = NavSnapshot('https://example.invalid/NAVAll.txt')
+        snapshot.get(FakeSession([FakeResponse(NAV_ALL)]))
+        self.assertEqual(snapshot.quote('101305'), {'scheme_code': '101305',
+                                                    'scheme_name': 'DSP Short Term Fund - Regular Plan - IDCW',
+                                                    'last_updated': '17-Oct-2026',
+                                                    'nav': '12.1212'})
+        # a code appearing inside another scheme's line must not match
+        self.assertIsNone(snapshot.quote('1305'))
+        self.assertIsNone(snapshot.quote('12'))
+        # last_updated is the date text AMFI published, also when it does not parse
+        snapshot = NavSnapshot('https://example.invalid/NAVAll.txt')
+        snapshot.get(FakeSession([FakeResponse(NAV_ALL.replace('12.1212;17-Oct-2026', 'N.A.;N.A.'))]))
+        self.assertEqual((snapshot.quote('101305')['last_updated'], snapshot.schemes['101305'].date), ('N.A.', None))
+
+    def test_parse_nav_all_records(self):
+        records = list(parse_nav_all(NAV_ALL.splitlines()))
+        self.assertEqual([r.scheme_code for r in records], ['119551', '101305'])
+        self.assertEqual(records[0], NavRecord('119551', 'INF209KA12Z1', 'INF209KA13Z9',
+                                               'Aditya Birla Sun Life Banking & PSU Debt Fund  - DIRECT - IDCW',
+                                               106.2498, datetime.date(2026, 10, 17),
+                                               'Aditya Birla Sun Life Mutual Fund', 'Open Ended Schemes',
+                                               'Debt Scheme - Banking and PSU Fund', '106.2498', '17-Oct-2026'))
+        df = nav_records_frame(records)
+        self.assertEqual(str(df['nav'].dtype), 'float64')
+        self.assertEqual(df.loc['101305', 'amc'], 'Aditya Birla Sun Life Mutual Fund')
+
+    def test_snapshot_stale_after_publish_time(self):
+        snapshot = NavSnapshot('https://example.invalid/NAVAll.txt', ttl=None)
+        snapshot._checked_at = last_publish_time() - 1
+        self.assertTrue(snapshot.is_stale())
+        snapshot._checked_at = last_publish_time() + 1
+        self.assertFalse(snapshot.is_stale(now=snapshot._checked_at))
+
+
+class TestConstruction(unittest.TestCase):
+    def test_construction_is_offline(self):
+        with mock.patch('requests.Session.get', side_effect=AssertionError('network used')):
+            mf = Mftool()
+        self.assertIs(mf._const, Mftool()._const)
+
+    def test_retired_code_invalid(self):
+        mf = Mftool()
+        mf._snapshot = NavSnapshot('https://example.invalid/NAVAll.txt')
+        session = FakeSession([FakeResponse(NAV_ALL)])
+        with mock.patch.object(mf._transport, 'get', side_effect=lambda url, **kwargs: session.get(url, **kwargs)):
+            # 100027 is a retired scheme, listed in scheme_codes.json but not in NAVAll.txt
+            self.assertFalse(mf.is_valid_code('100027'))
+            self.assertTrue(mf.is_valid_code('119551'))
+        self.assertEqual(len(session.requests), 1)
+        self.assertFalse(mf.is_valid_code('100027'))
+        self.assertIsNone(mf.get_scheme_quote('100027'))
+        self.assertIsNone(mf.calculate_balance_units_value('100027', 10))
+        self.assertIsNone(mf.calculate_returns('100027', 10, 2000, 12))
+        self.assertEqual(mf.calculate_balance_units_value('101305', 10)['balance_units_value'], '121.21')
+
+
+class FakePerformanceClient:
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, url, json=None, **kwargs):
+        self.payloads.append(json)
+        body = {'data': [{'schemeName': 'Scheme %s' % json['subCategory'], 'benchmark': 'NIFTY 50',
+                          'navRegular': 10.0, 'navDirect': 11.0,
+                          'return1YearRegular': 1.0, 'return1YearDirect': 1.1,
+                          'return3YearRegular': 3.0, 'return3YearDirect': 3.1,
+                          'return5YearRegular': 5.0, 'return5YearDirect': 5.1}]}
+        return mock.Mock(status_code=200, json=lambda: body)
+
+
+class TestSchemePerformance(unittest.TestCase):
+    def test_all_open_ended_scheme_performance(self):
+        mf = Mftool()
+        client = FakePerformanceClient()
+        with mock.patch.object(mf._session, 'post', side_effect=client.post):
+            result = mf.get_all_open_ended_scheme_performance('17-Oct-2026')
+            debt = mf.get_open_ended_debt_scheme_performance('17-Oct-2026')
+        self.assertEqual(len(client.payloads), 39)
+        self.assertEqual({p['reportDate'] for p in client.payloads}, {'17-Oct-2026'})
+        self.assertEqual(result['Equity']['Large Cap'][0]['scheme_name'], 'Scheme 1')
+        self.assertEqual(result['Other']['Index Funds/ETFs'][0]['benchmark'], 'NIFTY 50')
+        self.assertEqual(debt, result['Debt'])
+
+    def test_failure_raises_typed_error(self):
+        mf = Mftool(transport=Transport(retries=0))
+        with mock.patch.object(mf._session, 'post', return_value=FakeResponse(status_code=500)):
+            with self.assertRaises(UpstreamHTTPError) as raised:
+                mf.get_open_ended_equity_scheme_performance('17-Oct-2026')
+        self.assertEqual(raised.exception.status_code, 500)
+        # still caught by handlers written for requests
+        self.assertIsInstance(raised.exception, requests.HTTPError)
+
+    def test_only_reports_past_revision_window_are_final(self):
+        self.assertTrue(is_report_final('01-Oct-2026', datetime.date(2026, 10, 8)))
+        self.assertFalse(is_report_final('02-Oct-2026', datetime.date(2026, 10, 8)))
+        self.assertFalse(is_report_final('2026-10-01', datetime.date(2026, 10, 8)))
+        mf = Mftool()
+        client = FakePerformanceClient()
+        with mock.patch.object(mf._session, 'post', side_effect=client.post), \
+                mock.patch.object(mf._cache, 'set', wraps=mf._cache.set) as cache_set:
+            mf._get_daily_scheme_performance(mf._get_open_ended_equity_scheme_url, '01-Jan-2020', 1, '1')
+            # other formats are passed through to AMFI and cached with the ttl
+            mf._get_daily_scheme_performance(mf._get_open_ended_equity_scheme_url, '2020-01-02', 1, '1')
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [None, 3600])
+
+
+class TestTransport(unittest.TestCase):
+    def test_retries_timeouts_then_raises_typed_error(self):
+        transport = Transport(timeout=(1, 2), retries=2)
+        with mock.patch.object(transport.session, 'get', side_effect=requests.ReadTimeout('slow')) as get, \
+                mock.patch('mftool.transport.backoff_delay', return_value=0):
+            with self.assertRaises(UpstreamTimeout):
+                transport.get('https://api.mfapi.in/mf/101305')
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(get.call_args.kwargs['timeout'], (1, 2))
+
+    def test_circuit_opens_per_host_and_recovers(self):
+        transport = Transport(retries=0, failure_threshold=2, reset_timeout=60)
+        with mock.patch.object(transport.session, 'get', side_effect=requests.ConnectionError('down')) as get:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    transport.get('https://www.amfiindia.com/spages/NAVAll.txt')
+            with self.assertRaises(CircuitOpenError) as raised:
+                transport.get('https://www.amfiindia.com/spages/NAVAll.txt')
+            self.assertEqual(get.call_count, 2)
+        self.assertEqual(raised.exception.host, 'www.amfiindia.com')
+        self.assertGreater(raised.exception.retry_after, 0)
+        self.assertEqual(transport.breaker('api.mfapi.in').state, 'closed')
+
+        breaker = transport.breaker('www.amfiindia.com')
+        breaker._opened_at -= 60
+        self.assertEqual(breaker.state, 'half-open')
+        with mock.patch.object(transport.session, 'get', return_value=FakeResponse()):
+            transport.get('https://www.amfiindia.com/spages/NAVAll.txt')
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_failed_trial_reopens_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0)
+        for _ in range(3):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        # one trial at a time
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.failures, 4)
+        self.assertTrue(breaker.allow())
+
+    def test_client_errors_are_not_retried(self):
+        transport = Transport(retries=3)
+        with mock.patch.object(transport.session, 'post', return_value=FakeResponse(status_code=404)) as post:
+            with self.assertRaises(UpstreamHTTPError):
+                transport.post('https://www.amfiindia.com/modules/AMCProfileDetail', data={'Id': 3})
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(transport.breaker('www.amfiindia.com').failures, 0)
+
+
+SCHEME_101305 = {'meta': {'fund_house': 'DSP Mutual Fund', 'scheme_type': 'Open Ended Schemes',
+                          'scheme_category': 'Debt Scheme - Short Duration Fund', 'scheme_code': 101305,
+                          'scheme_name': 'DSP Short Term Fund - Regular Plan - IDCW'},
+                 'data': [{'date': '17-10-2026', 'nav': '12.12120'}, {'date': '16-10-2026', 'nav': '12.10000'}]}
+
+
+class TestBulkHistoricalNav(unittest.TestCase):
+    def test_schemes_historical_nav_retries_and_reports_failures(self):
+        mf = Mftool()
+        mf._snapshot = loaded_snapshot()
+        attempts = {}
+
+        def get(url, **kwargs):
+            code = url.rsplit('/', 1)[-1]
+            attempts[code] = attempts.get(code, 0) + 1
+            if code == '119551' or attempts[code] == 1:
+                return FakeResponse(status_code=503)
+            response = FakeResponse(status_code=200)
+            response.json = lambda: SCHEME_101305
+            return response
+
+        with mock.patch.object(mf._session, 'get', side_effect=get), \
+                mock.patch('mftool.transport.backoff_delay', return_value=0):
+            result = mf.get_schemes_historical_nav(['101305', 119551, 'wrong code'], retries=2, rate_limit=1000)
+            df = mf.get_schemes_historical_nav(['101305'], rate_limit=1000, as_Dataframe=True)
+        self.assertEqual(result['data']['101305']['scheme_name'], 'DSP Short Term Fund - Regular Plan - IDCW')
+        self.assertEqual(attempts['119551'], 3)
+        self.assertEqual(sorted(result['errors']), ['119551', 'wrong code'])
+        self.assertEqual(df.loc[('101305', '2026-10-17'), 'nav'], 12.1212)
+        self.assertEqual(df.attrs['errors'], {})
+
+    def test_no_rate_limit(self):
+        mf = Mftool()
+        mf._snapshot = loaded_snapshot()
+        response = FakeResponse(status_code=200)
+        response.json = lambda: SCHEME_101305
+        for rate_limit in (None, 0):
+            with mock.patch.object(mf._session, 'get', return_value=response), \
+                    mock.patch.object(RateLimiter, 'acquire') as acquire:
+                result = mf.get_schemes_historical_nav(['101305'], rate_limit=rate_limit)
+            self.assertEqual(result['errors'], {})
+            acquire.assert_not_called()
+        limiter = RateLimiter(None)
+        with mock.patch('time.sleep') as sleep:
+            for _ in range(100):
+                limiter.acquire()
+        sleep.assert_not_called()
+
+
+class TestInstrumentation(unittest.TestCase):
+    def scheme_response(self):
+        response = FakeResponse(json.dumps(SCHEME_101305))
+        response.json = lambda: SCHEME_101305
+        return response
+
+    def test_call_stats_per_public_method(self):
+        calls = []
+        mf = Mftool(metrics=calls.append)
+        mf._snapshot = loaded_snapshot()
+        response = self.scheme_response()
+        with mock.patch.object(mf._session, 'get', return_value=response):
+            mf.get_scheme_historical_nav('101305')
+            mf.get_scheme_historical_nav('101305', as_Dataframe=True)
+        first, second = calls
+        self.assertEqual((first.method, first.requests, first.bytes), ('get_scheme_historical_nav', 1,
+                                                                       len(response.content)))
+        self.assertEqual((first.cache_hits, first.cache_misses, first.result_size), (0, 1, 2))
+        self.assertGreater(first.parse_time, 0)
+        self.assertGreaterEqual(first.duration, first.fetch_time + first.parse_time)
+        # served from the cache, rendered as a Dataframe of two NAVs
+        self.assertEqual((second.requests, second.cache_hits, second.result_size), (0, 1, 2))
+        self.assertGreater(second.render_time, 0)
+
+    def test_batch_counts_worker_threads_and_errors(self):
+        calls = []
+        mf = Mftool(metrics=calls.append, transport=Transport(retries=0))
+        mf._snapshot = loaded_snapshot()
+        with mock.patch.object(mf._session, 'get', return_value=self.scheme_response()):
+            mf.get_schemes_historical_nav(['101305', '119551'], as_Dataframe=True)
+        self.assertEqual([(c.method, c.requests, c.cache_misses) for c in calls],
+                         [('get_schemes_historical_nav', 2, 2)])
+        with mock.patch.object(mf._session, 'post', return_value=FakeResponse(status_code=503)):
+            with self.assertRaises(UpstreamHTTPError):
+                mf.get_open_ended_equity_scheme_performance('17-Oct-2026')
+        self.assertEqual(calls[-1].error, 'UpstreamHTTPError')
+        self.assertIsNone(calls[-1].result_size)
+
+    def test_no_stats_by_default(self):
+        mf = Mftool()
+        mf._snapshot = loaded_snapshot()
+        self.assertFalse(mf._metrics.enabled)
+        with mock.patch('mftool.instrumentation.CallStats', side_effect=AssertionError('measured')), \
+                mock.patch.object(mf._session, 'get', return_value=self.scheme_response()):
+            mf.get_scheme_historical_nav('101305')
+
+    @unittest.skipUnless(importlib.util.find_spec('prometheus_client'), 'prometheus_client is not installed')
+    def test_prometheus(self):
+        import prometheus_client
+        registry = prometheus_client.CollectorRegistry()
+        mf = Mftool(metrics=PrometheusMetrics(registry))
+        mf._snapshot = loaded_snapshot()
+        with mock.patch.object(mf._session, 'get', return_value=self.scheme_response()):
+            mf.get_scheme_historical_nav('101305')
+        self.assertEqual(registry.get_sample_value('mftool_requests_total',
+                                                   {'method': 'get_scheme_historical_nav'}), 1)
+
+
+class TestHistoricalNavForDates(unittest.TestCase):
+    def test_date_range_binary_search(self):
+        data = [{'date': '17-10-2026', 'nav': '3'}, {'date': '16-10-2026', 'nav': '2'},
+                {'date': '30-09-2026', 'nav': '1'}, {'date': '31-12-2025', 'nav': '0'}]
+        self.assertEqual(get_date_range(data, datetime.date(2026, 9, 30), datetime.date(2026, 10, 16)), data[1:3])
+        self.assertEqual(get_date_range(data, datetime.date(2025, 1, 1), datetime.date(2027, 1, 1)), data)
+        self.assertEqual(get_date_range(data, datetime.date(2026, 1, 1), datetime.date(2026, 9, 29)), [])
+
+    def test_single_fetch(self):
+        mf = Mftool()
+        mf._snapshot = loaded_snapshot()
+        response = FakeResponse()
+        response.json = lambda: SCHEME_101305
+        with mock.patch.object(mf._session, 'get', return_value=response) as get:
+            result = mf.get_scheme_historical_nav_for_dates('101305', '17-10-2026', '31-10-2026')
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(result['scheme_name'], 'DSP Short Term Fund - Regular Plan - IDCW')
+        self.assertEqual(result['data'], [{'date': '17-10-2026', 'nav': '12.12120'}])
+
+
+class TestHighLow(unittest.TestCase):
+    def test_52_week_high_low_single_pass(self):
+        today = datetime.date.today()
+        rows = [{'date': (today - datetime.timedelta(weeks=weeks)).strftime('%d-%m-%Y'), 'nav': nav}
+                for weeks, nav in [(0, '9.50000'), (10, '10.20000'), (30, '8.90000'), (51, '10.10000'),
+                                   (53, '100.00000'), (60, '1.00000')]]
+        self.assertEqual(get_52_week_high_low(rows), {'52_week_high': '10.20000', '52_week_low': '8.90000'})
+        self.assertEqual(get_52_week_high_low(rows[4:]), {'52_week_high': None, '52_week_low': None})
+        high_low = analytics.high_low(analytics.nav_panel({'101305': {'data': rows}}))
+        self.assertEqual(list(high_low.loc['101305']), [10.2, 8.9])
+
+
+class TestXirr(unittest.TestCase):
+    def test_xirr_batch(self):
+        rates = analytics.xirr_batch([
+            [(datetime.date(2020, 1, 1), -1000), (datetime.date(2020, 12, 31), 1100)],
+            [('01-01-2020', -100), ('01-07-2020', -100), ('01-01-2021', 250)],
+            [('01-01-2020', -1000), ('01-01-2021', 100)],
+            [('01-01-2020', -1000)]])
+        self.assertAlmostEqual(rates[0], 0.1, places=6)
+        self.assertAlmostEqual(rates[1], 0.33996, places=4)
+        self.assertAlmostEqual(rates[2], -0.8994, places=3)
+        self.assertTrue(rates[3] != rates[3])
+
+    def test_calculate_returns_uses_instalment_dates(self):
+        mf = Mftool()
+        quote = {'scheme_code': '101305', 'scheme_name': 'DSP Short Term Fund', 'last_updated': '01-Feb-2022',
+                 'nav': '10.0'}
+        with mock.patch.object(mf, 'is_valid_code', return_value=True), \
+                mock.patch.object(mf, 'get_scheme_quote', return_value=quote):
+            value = mf.calculate_returns('101305', balanced_units=1300, monthly_sip=1000, investment_in_months=12)
+        self.assertEqual(value['absolute_return'], '8.33 %')
+        self.assertEqual(value['IRR_annualised_return'], '15.62 %')
+        with mock.patch.object(mf, 'is_valid_code', return_value=True), \
+                mock.patch.object(mf, 'get_scheme_quote', return_value=dict(quote)):
+            value = mf.calculate_returns('101305', balanced_units=0, monthly_sip=1000, investment_in_months=12)
+        self.assertEqual(value['absolute_return'], '-100.00 %')
+        self.assertIsNone(value['IRR_annualised_return'])
+
+    def test_portfolio_returns(self):
+        mf = Mftool()
+        history = {'data': [{'date': '03-01-2022', 'nav': '12.00000'}, {'date': '03-01-2021', 'nav': '10.00000'},
+                            {'date': '31-12-2020', 'nav': '9.99000'}]}
+        portfolios = {'folio-1': [('101305', '02-01-2021', 1000)],
+                      'folio-2': [(101305, '03-01-2021', 500), ('101305', '03-01-2022', -600)],
+                      'folio-3': [('119551', '03-01-2021', 1000)],
+                      'folio-4': [('101305', '30-12-2020', 1000), ('101305', '04-01-2022', 1000)]}
+        fetched = {'data': {'101305': history}, 'errors': {'119551': 'HTTPError: 503'}}
+        with mock.patch.object(mf, 'get_schemes_historical_nav', return_value=fetched):
+            result = mf.calculate_portfolio_returns(portfolios)
+        self.assertEqual(result['data']['folio-1']['market_value'], 1200)
+        self.assertAlmostEqual(result['data']['folio-1']['xirr'], 0.2, places=2)
+        self.assertEqual(result['data']['folio-2']['units'], {'101305': 0.0})
+        self.assertAlmostEqual(result['data']['folio-2']['xirr'], 0.2, places=2)
+        self.assertEqual(list(result['errors']), ['folio-3', 'folio-4'])
+        # transactions before the first NAV or after the latest one are not priced
+        self.assertEqual(result['errors']['folio-4'],
+                         'no NAV for 30-12-2020, 04-01-2022, NAVs are from 31-12-2020 to 03-01-2022')
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        import pandas as pd
+        dates = pd.bdate_range('2020-01-01', '2026-10-16')
+        self.nav = pd.Series(10 * 1.1 ** ((dates - dates[0]).days / 365.25), index=dates)
+
+    def test_simulate_sip_and_lumpsum(self):
+        df = analytics.simulate(self.nav, '01-01-2021', 1000, end='31-12-2021')
+        self.assertEqual(df['amount'].gt(0).sum(), 12)
+        self.assertEqual(df['invested'].iloc[-1], 12000)
+        self.assertAlmostEqual(df.attrs['summary']['xirr'], 0.1, places=2)
+        self.assertEqual(df.attrs['summary']['max_drawdown'], 0)
+        lumpsum = analytics.simulate(self.nav, '01-01-2021', 12000, lumpsum=True)
+        self.assertEqual(lumpsum['amount'].gt(0).sum(), 1)
+        self.assertAlmostEqual(lumpsum.attrs['summary']['xirr'], 0.1, places=3)
+        with self.assertRaises(ValueError):
+            analytics.simulate(self.nav, '01-01-2019', 1000)
+
+    def test_sweep_matches_simulate(self):
+        import pandas as pd
+        panel = analytics.nav_panel({'a': self.nav, 'b': self.nav[self.nav.index >= '2023-01-01'] * 3})
+        result = analytics.sweep(panel, pd.date_range('2021-01-01', '2023-01-01', freq='MS'), 1000, 12)
+        self.assertEqual(len(result), 50)
+        self.assertTrue(result.loc[('2022-01-01', 'b'), ['value', 'xirr']].isna().all())
+        single = analytics.simulate(self.nav, '01-03-2021', 1000, end='28-02-2022')
+        self.assertAlmostEqual(result.loc[('2021-03-01', 'a'), 'value'],
+                               single['units'].iloc[-1] * self.nav['2022-03-01'])
+
+    def test_backtest_basket(self):
+        mf = Mftool()
+        history = {'data': [{'date': '03-01-2022', 'nav': '12.00000'}, {'date': '04-01-2021', 'nav': '10.00000'}]}
+        fetched = {'data': {'101305': history, '119551': history}, 'errors': {}}
+        with mock.patch.object(mf, 'get_schemes_historical_nav', return_value=fetched):
+            df = mf.backtest([101305, '119551'], '04-01-2021', 1000, lumpsum=True, weights={101305: 3, '119551': 1})
+        self.assertEqual(df.attrs['summary']['value'], 1200)
+        self.assertNotIn('units', df.columns)
+        with mock.patch.object(mf, 'get_schemes_historical_nav', return_value={'data': {}, 'errors': {'1': 'x'}}):
+            self.assertIsNone(mf.backtest('1', '04-01-2021', 1000))
+
+
+class TestNavPanel(unittest.TestCase):
+    def test_panel_aligns_histories(self):
+        mf = Mftool()
+        first = {'scheme_name': 'First', 'data': [{'date': '19-10-2026', 'nav': '12.00000'},
+                                                  {'date': '15-10-2026', 'nav': '11.00000'},
+                                                  {'date': '14-10-2026', 'nav': '10.00000'}]}
+        second = {'scheme_name': 'Second', 'data': [{'date': '16-10-2026', 'nav': '20.00000'},
+                                                    {'date': '15-10-2026', 'nav': '21.00000'}]}
+        fetched = {'data': {'101305': first, '119551': second}, 'errors': {'1': 'ValueError: Invalid scheme code'}}
+        with mock.patch.object(mf, 'get_schemes_historical_nav', return_value=fetched):
+            panel = mf.get_nav_panel(['119551', 101305, '1'], start_date='15-10-2026')
+            unfilled = mf.get_nav_panel(['119551', '101305'], fill_limit=0)
+        self.assertEqual(list(panel.columns), ['119551', '101305'])
+        self.assertEqual([str(day.date()) for day in panel.index], ['2026-10-15', '2026-10-16', '2026-10-19'])
+        self.assertEqual(panel['101305'].tolist(), [11.0, 11.0, 12.0])
+        self.assertTrue(panel['119551'].iloc[-1] != panel['119551'].iloc[-1])
+        self.assertEqual(panel.attrs['scheme_names'], {'119551': 'Second', '101305': 'First'})
+        self.assertEqual(list(panel.attrs['errors']), ['1'])
+        self.assertTrue(unfilled['101305'].isna().any())
+        self.assertEqual(unfilled.dtypes.tolist(), ['float64', 'float64'])
+
+
+class TestNavHistory(unittest.TestCase):
+    def test_typed_history(self):
+        import numpy as np
+        mf = Mftool()
+        mf._snapshot = loaded_snapshot()
+        with mock.patch.object(mf, '_get_scheme_response', return_value=SCHEME_101305):
+            history = mf.get_scheme_historical_nav(101305, as_history=True)
+        self.assertIsInstance(history, NavHistory)
+        self.assertFalse(hasattr(history, '__dict__'))
+        self.assertEqual(history.scheme_code, '101305')
+        self.assertEqual(history.dates.dtype, np.dtype('datetime64[s]'))
+        self.assertEqual(history.navs.tolist(), [12.1, 12.1212])
+        self.assertEqual(str(history.latest[0])[:10], '2026-10-17')
+        frame = history.to_frame()
+        self.assertEqual(frame['nav'].dtype, 'float64')
+        self.assertTrue(np.shares_memory(frame['nav'].to_numpy(), history.navs))
+        self.assertEqual(analytics.nav_series(history).iloc[-1], 12.1212)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_to_arrow(self):
+        table = NavHistory.from_response(SCHEME_101305).to_arrow()
+        self.assertEqual(table.column('nav').to_pylist(), [12.1, 12.1212])
+
+
+AMC_PAGE = """<table><tbody><tr><td>AMC Name</td><td> DSP Mutual Fund </td></tr>
+<tr><td>Setup Date</td><td>16-Dec-1996</td></tr></tbody></table>"""
+
+
+class TestAmcProfiles(unittest.TestCase):
+    def test_profiles_fetched_concurrently_and_cached(self):
+        mf = Mftool()
+        mf._amc = [3, 53, 1]
+        with mock.patch.object(mf._session, 'post', return_value=FakeResponse(AMC_PAGE)) as post:
+            profiles = mf.get_all_amc_profiles(False)
+            mf.get_all_amc_profiles(False)
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(sorted(call.kwargs['data']['Id'] for call in post.call_args_list), [1, 3, 53])
+        self.assertEqual(profiles, [{'AMC Name': 'DSP Mutual Fund', 'Setup Date': '16-Dec-1996'}] * 3)
+
+
+class TestAverageAum(unittest.TestCase):
+    def test_quarters(self):
+        self.assertEqual(get_quarters('October - December 2019', 'April - June 2020'),
+                         ['October - December 2019', 'January - March 2020', 'April - June 2020'])
+        self.assertTrue(is_quarter_final('January - March 2026', datetime.date(2026, 5, 16)))
+        self.assertFalse(is_quarter_final('January - March 2026', datetime.date(2026, 5, 15)))
+
+    def test_range_is_numeric_and_caches_final_quarters(self):
+        mf = Mftool(transport=Transport(retries=0))
+
+        def post(url, headers=None, data=None, **kwargs):
+            if data['Year_Quarter'] == 'July - September 2020':
+                return FakeResponse(status_code=500)
+            return FakeResponse("""<table><tbody><tr><td>1</td><td>Axis Mutual Fund</td><td>1,234.50</td>
+                <td>2,34,567.89</td></tr><tr><td>2</td><td>DSP Mutual Fund</td><td>0.00</td><td>10.00</td></tr>
+                </tbody></table>""")
+
+        with mock.patch.object(mf._session, 'post', side_effect=post) as session_post:
+            df = mf.get_average_aum_range('January - March 2020', 'July - September 2020')
+            mf.get_average_aum('April - June 2020')
+        self.assertEqual(session_post.call_count, 3)
+        self.assertEqual(df.loc[('April - June 2020', 'Axis Mutual Fund'), 'AAUM Domestic'], 234567.89)
+        self.assertEqual(df['AAUM Overseas'].dtype, 'float64')
+        self.assertEqual(list(df.index.get_level_values('quarter').unique()),
+                         ['January - March 2020', 'April - June 2020'])
+        self.assertEqual(list(df.attrs['errors']), ['July - September 2020'])
+
+
+class TestSchemeSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = SchemeSearchIndex.from_scheme_codes(get_bundled_scheme_codes())
+
+    def test_prefix_multi_token_and_typo(self):
+        names = [r['scheme_name'] for r in self.index.search('parag parikh flex', limit=3)]
+        self.assertTrue(names and all(n.startswith('Parag Parikh Flexi Cap') for n in names))
+        result = self.index.search('mirae asest large', limit=1)
+        self.assertTrue(result[0]['scheme_name'].startswith('Mirae Asset Large Cap'))
+        for result in self.index.search('parag parikh flexi', plan='Direct', option='Growth'):
+            self.assertIn('Direct', result['scheme_name'])
+            self.assertIn('Growth', result['scheme_name'])
+        self.assertEqual(self.index.search('zzqqxx'), [])
+
+    def test_contains_matches_substring_scan(self):
+        # queries starting in the middle of a word match like a substring scan
+        for amc in ['ICICI', 'Axis', 'aditya birla', 'xis', 'dfc', 'ya birla sun', 'ia']:
+            expected = {k: v for k, v in get_bundled_scheme_codes().items() if amc.lower() in v.lower()}
+            self.assertEqual(list(self.index.contains(amc).items()), list(expected.items()))
+        self.assertEqual(self.index.contains('a'), self.index.contains('A'))
+
+    def test_split_and_joined_words(self):
+        index = SchemeSearchIndex([('1', 'SBI Bluechip Fund - Direct Plan - Growth', 'SBI Mutual Fund'),
+                                   ('2', 'Canara Robeco Blue Chip Equity Fund - Regular Plan - IDCW', None),
+                                   ('3', 'SBI Small Cap Fund - Direct Plan - Growth', 'SBI Mutual Fund')])
+        self.assertEqual([r['scheme_code'] for r in index.search('sbi blue chip')], ['1'])
+        self.assertEqual([r['scheme_code'] for r in index.search('bluechip equity')], ['2'])
+        self.assertEqual([r['scheme_code'] for r in index.search('small cap', option='Growth')], ['3'])
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        import pandas as pd
+        dates = pd.bdate_range('2020-01-01', '2026-10-16')
+        growth = pd.Series(1.1 ** ((dates - dates[0]).days / 365.25), index=dates)
+        young = growth[dates >= '2025-01-01'] * 2
+        self.panel = analytics.nav_panel({'growth': growth, 'young': young})
+
+    def test_nav_series_from_history(self):
+        series = analytics.nav_series(SCHEME_101305)
+        self.assertEqual(series.dtype, 'float64')
+        self.assertTrue(series.index.is_monotonic_increasing)
+        self.assertEqual(series.iloc[-1], 12.1212)
+
+    def test_returns_and_risk(self):
+        trailing = analytics.trailing_returns(self.panel)
+        self.assertAlmostEqual(trailing.loc['growth', '1Y'], 0.1, places=2)
+        self.assertAlmostEqual(trailing.loc['growth', '5Y'], 0.1, places=3)
+        self.assertTrue(trailing.loc['young', ['3Y', '5Y']].isna().all())
+        self.assertAlmostEqual(analytics.cagr(self.panel)['young'], 0.1, places=3)
+        self.assertEqual(analytics.max_drawdown(self.panel)['growth'], 0)
+        self.assertAlmostEqual(analytics.calendar_year_returns(self.panel).loc[2021, 'growth'], 0.1, places=2)
+        self.assertTrue(analytics.rolling_returns(self.panel, 1)['young'].loc[:'2025-12-31'].isna().all())
+        summary = analytics.summary(self.panel, risk_free=0.05)
+        self.assertEqual(list(summary.index), ['growth', 'young'])
+        self.assertGreater(summary.loc['growth', 'sharpe'], 0)
+
+
+class TestAsyncMftool(unittest.TestCase):
+    def test_async_fetch_methods(self):
+        import httpx
+        scheme = {'meta': {'fund_house': 'DSP Mutual Fund', 'scheme_type': 'Open Ended Schemes',
+                           'scheme_category': 'Debt Scheme - Short Duration Fund', 'scheme_code': 101305,
+                           'scheme_name': 'DSP Short Term Fund - Regular Plan - IDCW'},
+                  'data': [{'date': '17-10-2026', 'nav': '12.12120'}, {'date': '16-10-2026', 'nav': '12.10000'}]}
+
+        def handler(request):
+            if request.url.path.endswith('NAVAll.txt'):
+                return httpx.Response(200, text=NAV_ALL)
+            if request.url.path.startswith('/mf/'):
+                return httpx.Response(200, json=scheme)
+            return httpx.Response(200, json={'data': []})
+
+        async def run():
+            async with AsyncMftool() as mf:
+                mf._snapshot = NavSnapshot('https://example.invalid/NAVAll.txt')
+                mf._transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+                quotes = await asyncio.gather(mf.get_scheme_quote('101305'), mf.get_scheme_quote('119551'))
+                details = await mf.get_scheme_details('101305')
+                performance = await mf.get_all_open_ended_scheme_performance('17-Oct-2026')
+                return quotes, details, performance
+
+        quotes, details, performance = asyncio.run(run())
+        self.assertEqual([q['nav'] for q in quotes], ['12.1212', '106.2498'])
+        self.assertEqual(details['scheme_start_date'], {'date': '16-10-2026', 'nav': '12.10000'})
+        self.assertEqual(performance['Hybrid']['Arbitrage'], [])
+
+    def test_async_snapshot_parsed_off_the_loop_under_its_lock(self):
+        import httpx
+        import threading
+        snapshot = NavSnapshot('https://example.invalid/NAVAll.txt')
+        update = snapshot.update
+        calls = []
+
+        def record(response):
+            calls.append((threading.current_thread(), snapshot._lock.locked()))
+            update(response)
+
+        async def run():
+            async with AsyncMftool() as mf:
+                mf._snapshot = snapshot
+                mf._transport.client = httpx.AsyncClient(
+                    transport=httpx.MockTransport(lambda request: httpx.Response(200, text=NAV_ALL)))
+                with mock.patch.object(snapshot, 'update', side_effect=record):
+                    return await mf.get_scheme_quote('119551')
+
+        self.assertEqual(asyncio.run(run())['nav'], '106.2498')
+        self.assertEqual(len(calls), 1)
+        self.assertIsNot(calls[0][0], threading.main_thread())
+        self.assertTrue(calls[0][1])
+
+    def test_async_failures_raise_typed_errors(self):
+        import httpx
+        statuses = []
+
+        def handler(request):
+            statuses.append(503 if len(statuses) < 2 else 404)
+            return httpx.Response(statuses[-1], text='unavailable')
+
+        async def run():
+            async with AsyncMftool(transport=AsyncTransport(retries=2, backoff=0)) as mf:
+                mf._transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+                with self.assertRaises(UpstreamHTTPError) as raised:
+                    await mf._get_daily_scheme_performance('17-Oct-2026', 1, '1')
+                self.assertEqual(raised.exception.status_code, 404)
+                with self.assertRaises(UpstreamHTTPError):
+                    await mf.get_average_aum('July - September 2020')
+        asyncio.run(run())
+        # the 503s were retried, 404 is final
+        self.assertEqual(statuses, [503, 503, 404, 404])
+
+
+class TestImportTime(unittest.TestCase):
+    # heavy dependencies must only be imported by the methods which use them
+    HEAVY_MODULES = ('pandas', 'numpy', 'httpx', 'bs4', 'yfinance', 'matplotlib')
+    # seconds for a cold "import mftool", override with MFTOOL_IMPORT_BUDGET
+    IMPORT_BUDGET = float(os.environ.get('MFTOOL_IMPORT_BUDGET', 1.0))
+
+    def test_import_is_cheap(self):
+        script = ("import sys, time\n"
+                  "start = time.perf_counter()\n"
+                  "import mftool\n"
+                  "elapsed = time.perf_counter() - start\n"
+                  "print(elapsed)\n"
+                  "print(' '.join(m for m in %r if m in sys.modules))\n" % (self.HEAVY_MODULES,))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+        output = subprocess.check_output([sys.executable, '-c', script], env=env, universal_newlines=True)
+        elapsed, loaded = (output.split('\n') + [''])[:2]
+        log.info("import mftool took %.3f s", float(elapsed))
+        self.assertEqual(loaded.split(), [])
+        self.assertLess(float(elapsed), self.IMPORT_BUDGET)
+
+
 # ToDO : Add remaining test
 
 if __name__ == '__main__':
@@ -0,0 +1,78 @@
+"""
+    local HTTP stand-in for AMFI and mfapi.in, used by the offline tests
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class StandInServer:
+    """
+    serves registered routes on 127.0.0.1 and records every request
+
+    >>> with StandInServer() as server:
+    ...     server.route('/mf/101305', lambda request: (200, 'application/json', body))
+    ...     mf._get_scheme_url = server.url + '/mf/'
+    """
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so pooled clients reuse their connections like against the real hosts
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._handle(None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self._handle(self.rfile.read(length))
+
+            def _handle(self, body):
+                parts = urlsplit(self.path)
+                request = {'method': self.command, 'path': parts.path, 'query': parse_qs(parts.query),
+                           'headers': dict(self.headers), 'body': body}
+                with stand_in._lock:
+                    stand_in.requests.append(request)
+                handler = stand_in.routes.get(parts.path)
+                if handler is None:
+                    status, content_type, payload = 404, 'text/plain', 'Not Found'
+                else:
+                    status, content_type, payload = handler(request)
+                if not isinstance(payload, (str, bytes)):
+                    payload = json.dumps(payload)
+                if isinstance(payload, str):
+                    payload = payload.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def route(self, path, handler):
+        """
+        :param path: url path eg- '/mf/101305'
+        :param handler: callable(request) returning (status, content type, str / bytes / json-able body)
+        """
+        self.routes[path] = handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,101 @@
+"""
+    tests for the on-disk NAV store, run against a local stand-in for mfapi.in
+"""
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from mftool import Mftool
+from mftool.snapshot import IST, NavSnapshot
+from mftool.store import NavStore
+from mftool.transport import Transport
+from stand_in_server import StandInServer
+
+META = {'fund_house': 'DSP Mutual Fund', 'scheme_type': 'Open Ended Schemes',
+        'scheme_category': 'Debt Scheme - Short Duration Fund', 'scheme_code': 101305,
+        'scheme_name': 'DSP Short Term Fund - Regular Plan - IDCW'}
+HISTORY = [{'date': '17-10-2026', 'nav': '12.30000'}, {'date': '16-10-2026', 'nav': '12.20000'},
+           {'date': '15-10-2026', 'nav': '12.10000'}, {'date': '01-01-2018', 'nav': '10.00000'}]
+NAV_ALL = ("Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date\r\n"
+           "\r\nOpen Ended Schemes(Debt Scheme - Short Duration Fund)\r\n\r\nDSP Mutual Fund\r\n"
+           "101305;INF740K01NY4;-;DSP Short Term Fund - Regular Plan - IDCW;12.3000;17-Oct-2026\r\n")
+
+
+class TestNavStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'nav.sqlite')
+        self.server = StandInServer().__enter__()
+        self.server.route('/mf/101305', self.scheme)
+        self.server.route('/NAVAll.txt', lambda request: (200, 'text/plain', NAV_ALL))
+        self.available = HISTORY[1:]
+        # is_valid_code answers from the snapshot, load it before counting the scheme requests
+        self.snapshot = NavSnapshot(self.server.url + '/NAVAll.txt', ttl=None).get(Transport())
+        del self.server.requests[:]
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.directory)
+
+    def scheme(self, request):
+        data = self.available
+        if 'startDate' in request['query']:
+            start = request['query']['startDate'][0]
+            data = [dat for dat in data if dat['date'][6:] + dat['date'][3:5] + dat['date'][:2] >= start.replace('-', '')]
+        return 200, 'application/json', {'meta': META, 'data': data, 'status': 'SUCCESS'}
+
+    def mftool(self):
+        mf = Mftool(nav_store=self.path)
+        mf._get_scheme_url = self.server.url + '/mf/'
+        mf._snapshot = self.snapshot
+        return mf
+
+    def test_incremental_refresh(self):
+        nav = self.mftool().get_scheme_historical_nav('101305')
+        self.assertEqual(nav['data'], HISTORY[1:])
+        self.assertEqual(self.server.requests[-1]['query'], {})
+
+        # fresh since the last AMFI publish time, served without a request
+        self.mftool().get_scheme_details('101305')
+        self.assertEqual(len(self.server.requests), 1)
+
+        # a new day is published, only the delta after the last stored date is requested
+        self.available = HISTORY
+        store = NavStore(self.path)
+        with store._conn:
+            store._conn.execute("UPDATE scheme SET checked_at = 0")
+        store.close()
+        nav = self.mftool().get_scheme_historical_nav('101305')
+        self.assertEqual(self.server.requests[-1]['query']['startDate'], ['2026-10-17'])
+        self.assertEqual(nav['data'], HISTORY)
+        self.assertEqual(nav['scheme_start_date'], {'date': '01-01-2018', 'nav': '10.00000'})
+
+    def test_store_round_trip(self):
+        store = NavStore(':memory:')
+        self.assertIsNone(store.get('101305'))
+        self.assertIsNone(store.last_date('101305'))
+        store.append('101305', {'meta': META, 'data': HISTORY[2:]})
+        store.append('101305', {'meta': META, 'data': HISTORY[:3]})
+        self.assertEqual(store.get('101305'), {'meta': META, 'data': HISTORY})
+        self.assertEqual(str(store.last_date('101305')), '2026-10-17')
+        self.assertTrue(store.is_fresh('101305'))
+
+    def test_fresh_only_once_the_published_nav_is_stored(self):
+        # Friday's NAVs are published at 21:00 IST, mfapi.in has not ingested them a minute later
+        published = datetime.datetime(2026, 10, 16, 21, 0, tzinfo=IST).timestamp()
+        store = NavStore(':memory:')
+        store.append('101305', {'meta': META, 'data': HISTORY[2:]})
+        with store._conn:
+            store._conn.execute("UPDATE scheme SET checked_at = ?", (published + 60,))
+        self.assertTrue(store.is_fresh('101305', now=published + 120))
+        self.assertFalse(store.is_fresh('101305', now=published + 3600))
+        store.append('101305', {'meta': META, 'data': HISTORY[1:2]})
+        with store._conn:
+            store._conn.execute("UPDATE scheme SET checked_at = ?", (published + 86400 + 60,))
+        # Friday's NAV is the latest after Saturday's publish time as well
+        self.assertTrue(store.is_fresh('101305', now=published + 86400 + 3600))
+
+
+if __name__ == '__main__':
+    unittest.main()
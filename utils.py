@@ -1,8 +1,13 @@
 import json
 import os
-import json
-import pandas as pd
-from datetime import date, timedelta
+import importlib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+try:
+    from .instrumentation import timed
+except ImportError:
+    # utils is also imported as a top-level module, eg- by the tests
+    from instrumentation import timed
 
 
 def is_holiday():
@@ -27,19 +32,181 @@ def get_52_week_friday():
 
 
 def get_52_week_high_low(data):
-    friday = pd.to_datetime(get_52_week_friday(), dayfirst=True)
-    df = pd.DataFrame.from_records(data)
-    df['date'] = pd.to_datetime(df['date'], dayfirst=True)
-    df_high = df[df['date'] >= friday].sort_values(by='nav', ascending=False).head(1)
-    df_low = df[df['date'] >= friday].sort_values(by='nav', ascending=True).head(1)
-    return {"52_week_high": df_high['nav'].values[0], "52_week_low": df_low['nav'].values[0]}
+    """
+    returns the highest and lowest NAV of the last 52 weeks in one pass. rows are latest first,
+    so the scan stops at the first row older than 52 weeks and compares dates as 'YYYYmmdd' text
+    :param data: list of {'date': 'dd-mm-YYYY', 'nav': ...} sorted by date descending
+    :return: dict with the NAV text of the 52 week high and low, None when there is no NAV in the window
+    """
+    boundary = (date.today() - timedelta(weeks=52)).strftime('%Y%m%d')
+    high = low = None
+    high_nav = low_nav = 0.0
+    for row in data:
+        d = row['date']
+        if d[6:10] + d[3:5] + d[0:2] < boundary:
+            break
+        try:
+            nav = float(row['nav'])
+        except (TypeError, ValueError):
+            continue
+        if high is None or nav > high_nav:
+            high, high_nav = row['nav'], nav
+        if low is None or nav < low_nav:
+            low, low_nav = row['nav'], nav
+    return {"52_week_high": high, "52_week_low": low}
+
+
+def get_date_range(data, start_date, end_date):
+    """
+    returns the rows of latest first NAV data between start_date and end_date, both inclusive.
+    uses binary search, so only O(log n) dates are parsed
+    :param data: list of {'date': 'dd-mm-YYYY', 'nav': ...} sorted by date descending
+    :param start_date: datetime.date
+    :param end_date: datetime.date
+    :return: list
+    """
+    def key(i):
+        d = data[i]['date']
+        return d[6:10] + d[3:5] + d[0:2]
+
+    def first_before(bound):
+        # index of the first row dated before bound
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(mid) < bound:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    start = first_before((end_date + timedelta(days=1)).strftime('%Y%m%d'))
+    stop = first_before(start_date.strftime('%Y%m%d'))
+    return data[start:stop]
+
+
+def get_balance_units_value(scheme_info, balance_units):
+    """
+    adds the market value of balance units to a scheme quote
+    :param scheme_info: scheme quote dict
+    :param balance_units: balance units
+    :return: dict
+    """
+    market_value = float(balance_units)*float(scheme_info['nav'])
+    scheme_info.update(balance_units_value="{0:.2f}".format(market_value))
+    return scheme_info
+
+
+def add_months(day, months):
+    """
+    moves a date by whole months, clamping the day to the end of shorter months
+    :param day: datetime.date
+    :param months: months to add, negative to go back
+    :return: datetime.date
+    """
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    last_day = [31, 29 if leap else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month - 1]
+    return day.replace(year=year, month=month, day=min(day.day, last_day))
+
+
+def get_returns(scheme_info, balanced_units, monthly_sip, investment_in_months):
+    """
+    adds the final value, absolute return and annualised return of a SIP to a scheme quote.
+    the annualised return is the XIRR of monthly instalments, the last one a month before the NAV date
+    :param scheme_info: scheme quote dict
+    :param balanced_units: current balance units
+    :param monthly_sip: monthly investment in scheme
+    :param investment_in_months: months
+    :return: dict, IRR_annualised_return is None when the cash flows have no XIRR eg- zero balance units
+    """
+    from .analytics import xirr
+    investment_in_months = int(investment_in_months)
+    initial_investment = investment_in_months * float(monthly_sip)
+    market_value = float(float(balanced_units) * float(scheme_info['nav']))
+    absolute_return = ((market_value - initial_investment)/initial_investment) * 100
+    valuation_date = datetime.strptime(scheme_info['last_updated'], '%d-%b-%Y').date()
+    cashflows = [(add_months(valuation_date, -month), -float(monthly_sip))
+                 for month in range(investment_in_months, 0, -1)]
+    annualised_return = xirr(cashflows + [(valuation_date, market_value)]) * 100
+
+    scheme_info.update(final_investment_value="{0:.2f}".format(market_value))
+    scheme_info.update(absolute_return="%.2f %%" % (absolute_return))
+    scheme_info.update(IRR_annualised_return=None if annualised_return != annualised_return
+                       else "%.2f %%" % (annualised_return))
+    return scheme_info
+
+
+_MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+           'November', 'December']
+
+
+def parse_quarter(quarter):
+    """
+    :param quarter: string 'April - June 2020'
+    :return: tuple (year, first month) of the quarter
+    :raises: ValueError
+    """
+    try:
+        months, year = quarter.strip().rsplit(' ', 1)
+        first = months.split('-')[0].strip()
+        return int(year), _MONTHS.index(first) + 1
+    except ValueError:
+        raise ValueError("quarter should be like 'April - June 2020', got %r" % quarter)
 
 
+def get_quarters(start_quarter, end_quarter):
+    """
+    lists the quarters from start_quarter to end_quarter, both inclusive
+    :param start_quarter: string 'April - June 2020'
+    :param end_quarter: string 'January - March 2022'
+    :return: list of quarter strings, oldest first
+    """
+    year, month = parse_quarter(start_quarter)
+    end = parse_quarter(end_quarter)
+    quarters = []
+    while (year, month) <= end:
+        quarters.append("%s - %s %d" % (_MONTHS[month - 1], _MONTHS[month + 1], year))
+        year, month = (year + 1, month - 9) if month > 9 else (year, month + 3)
+    return quarters
+
+
+def is_quarter_final(quarter, today=None, lag_days=45):
+    """
+    tells whether AMFI has published the final average AUM of a quarter, lag_days after it ended
+    :param quarter: string 'April - June 2020'
+    :param today: datetime.date, default today
+    :return: bool
+    """
+    year, month = parse_quarter(quarter)
+    year, month = (year + 1, month - 9) if month > 9 else (year, month + 3)
+    return (today or date.today()) >= date(year, month, 1) + timedelta(days=lag_days)
+
+
+def is_report_final(report_date, today=None, lag_days=7):
+    """
+    tells whether AMFI can no longer revise a fund performance report, lag_days after its date.
+    a report_date not in 'DD-MMM-YYYY' format is never final
+    :param report_date: string '17-Oct-2026'
+    :param today: datetime.date, default today
+    :return: bool
+    """
+    try:
+        day = datetime.strptime(report_date, '%d-%b-%Y').date()
+    except (TypeError, ValueError):
+        return False
+    return (today or date.today()) >= day + timedelta(days=lag_days)
+
+
+@timed('render_time')
 def render_response(data, as_json=False, as_Dataframe=False):
     if as_json is True:
         return json.dumps(data)
     # parameter 'as_Dataframe' only works with get_scheme_historical_nav()
     elif as_Dataframe is True:
+        import pandas as pd
         df = pd.DataFrame.from_records(data['data'])
         df['dayChange'] = df['nav'].astype(float).diff(periods=-1)
         df = df.set_index('date')
@@ -48,9 +215,57 @@ def render_response(data, as_json=False, as_Dataframe=False):
         return data
 
 
+def import_optional(name, extra):
+    """
+    imports an optional dependency, pointing to the mftool extra which installs it
+    :param name: module name eg- 'yfinance', 'matplotlib.pyplot'
+    :param extra: name of the extra in setup.py
+    :return: module
+    :raises: ImportError
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise ImportError("%s is required for this method, install it with 'pip install mftool[%s]'"
+                          % (name.split('.')[0], extra))
+
+
+@lru_cache(maxsize=None)
+def load_json(filepath):
+    """
+    parses a bundled json file once per process, callers must not mutate the result
+    :param filepath: path of the json file
+    :return: parsed json
+    """
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_bundled_scheme_codes():
+    """
+    returns the AMFI scheme codes shipped in scheme_codes.json. they include retired schemes,
+    is_valid_code checks the codes of the live NAVAll.txt instead
+    :return: dict
+    """
+    return load_json(str(os.path.dirname(os.path.abspath(__file__))) + '/scheme_codes.json')
+
+
 class Utilities:
 
     def __init__(self):
         self._filepath = str(os.path.dirname(os.path.abspath(__file__))) + '/const.json'
-        with open(self._filepath, 'r') as f:
-            self.values = json.load(f)
+        self.values = load_json(self._filepath)
+
+
+@lru_cache(maxsize=None)
+def get_codes():
+    """
+    returns the new (Yahoo style) scheme codes from const.json as a dict of code and scheme name,
+    built once per process and shared by all Mftool instances
+    :return: dict
+    """
+    codes = {}
+    for cd in Utilities().values['codes']:
+        codes.update(cd)
+    return codes